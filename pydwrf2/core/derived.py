@@ -0,0 +1,116 @@
+"""Registry of variables derived from the raw WRF output.
+
+Each derived variable declares the variables it depends on. A Derived view
+of a dataset evaluates them lazily, only when requested, and caches the
+results so that intermediates such as the full pressure are shared by the
+variables that use them. Select the time records or levels first (isel) so
+that only that chunk is computed.
+"""
+
+REGISTRY = dict()
+
+
+def register(name, requires):
+    """Register a derived variable.
+
+    Args:
+        name : name of the derived variable
+        requires : variables it is computed from. A tuple lists
+            alternatives, the first one present is used.
+    """
+
+    def decorator(function):
+        REGISTRY[name] = (function, list(requires))
+        return function
+
+    return decorator
+
+
+def _alternatives(requirement):
+    if isinstance(requirement, tuple):
+        return list(requirement)
+    return [requirement]
+
+
+class Derived(object):
+    """Lazy view of a dataset that also provides the registered derived variables.
+
+    Args:
+        data : xarray.Dataset, possibly lazily loaded from a file
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.attrs = data.attrs
+        self._cache = dict()
+
+    def __contains__(self, name):
+        if name in self.data.variables or name in self._cache:
+            return True
+        if name not in REGISTRY:
+            return False
+        return all(
+            any(a in self for a in _alternatives(r)) for r in REGISTRY[name][1]
+        )
+
+    def __getitem__(self, name):
+        if name in self.data.variables:
+            return self.data[name]
+        if name in self._cache:
+            return self._cache[name]
+        if name not in REGISTRY:
+            raise KeyError("{} is neither in the dataset nor a derived variable".format(name))
+        function, requires = REGISTRY[name]
+        self._cache[name] = function(self)
+        return self._cache[name]
+
+    def first(self, requirement):
+        """Return the first available of a set of alternative variables."""
+        for name in _alternatives(requirement):
+            if name in self:
+                return self[name]
+        raise KeyError("Names not found: {}".format(",".join(_alternatives(requirement))))
+
+    def isel(self, **indexers):
+        """Derived view of a selection of the dataset, e.g. one time chunk."""
+        return Derived(self.data.isel(**indexers))
+
+
+def requirements(names, available=None):
+    """Raw variables needed to evaluate names.
+
+    Args:
+        names : list of raw or derived variable names
+        available : raw variables present in the file, used to pick between
+            alternatives. Default, the first alternative.
+    Returns:
+        list of raw variable names
+    """
+    result = []
+
+    def visit(name):
+        if name in REGISTRY and (available is None or name not in available):
+            for requirement in REGISTRY[name][1]:
+                options = _alternatives(requirement)
+                if available is not None:
+                    options = [o for o in options if o in available or o in REGISTRY] or options
+                visit(options[0])
+        elif name not in result:
+            result.append(name)
+
+    for name in names:
+        visit(name)
+    return result
+
+
+@register("PRES", ["P", "PB"])
+def pressure(data):
+    """Full pressure (Pa)."""
+    return data["P"] + data["PB"]
+
+
+@register("TEMP", [("T", "THETA"), "PRES"])
+def temperature(data):
+    """Temperature (K) from the perturbation potential temperature."""
+    theta = data.first(("T", "THETA")) + data.attrs["T0"]
+    return theta * (data["PRES"] / data.attrs["P0"]) ** (data.attrs["R_D"] / data.attrs["CP"])
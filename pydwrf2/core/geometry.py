@@ -0,0 +1,115 @@
+"""Static grid geometry shared by the area integral diagnostics.
+
+The cell areas only depend on the grid, so they are computed once per grid
+and reused for every file written on that grid.
+"""
+import hashlib
+from collections import OrderedDict
+import numpy as np
+import xarray
+
+MAX_GRIDS = 8
+_cache = OrderedDict()
+
+
+def static(nc, name):
+    """Return the first time record of a variable that may have a Time dimension."""
+    var = nc[name]
+    if "Time" in var.dims:
+        var = var.isel(Time=0)
+    return var
+
+
+def grid_key(nc):
+    """Hash of the static grid coordinates and planet radius."""
+    digest = hashlib.sha1()
+    for name in ["XLAT_V", "XLONG_U", "XLAT", "XLONG"]:
+        if name in nc:
+            values = np.ascontiguousarray(static(nc, name).values)
+            digest.update(name.encode("utf-8"))
+            digest.update(str(values.shape).encode("utf-8"))
+            digest.update(values.tobytes())
+    digest.update(repr(nc.attrs.get("RADIUS")).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def band_rows(south_north, south_lim=-90, north_lim=90):
+    """Contiguous slice of the rows with south_lim <= south_north < north_lim."""
+    south_north = np.asarray(south_north)
+    south_lim, north_lim = np.asarray(south_lim), np.asarray(north_lim)
+    selected = np.nonzero((south_north >= south_lim) & (south_north < north_lim))[0]
+    if selected.size == 0:
+        return slice(0, 0)
+    return slice(int(selected[0]), int(selected[-1]) + 1)
+
+
+class GridGeometry(object):
+    """Cell areas, latitudes and band totals for one grid.
+
+    Attributes:
+        key : hash of the static coordinates, see grid_key
+        lat : latitude of the cell centres (south_north, west_east)
+        area : cell areas from the staggered grid spacing (south_north, west_east)
+        zonal_area : exact area of each latitude band divided equally
+            between the cells in the band (south_north, west_east)
+        total_area : sum of area
+    """
+
+    def __init__(self, nc, key=None):
+        self.key = key or grid_key(nc)
+        dims = ("south_north", "west_east")
+        lat = static(nc, "XLAT").values
+        d2r = np.deg2rad
+        radius = nc.RADIUS
+
+        if "XLAT_V" in nc:
+            lat_v = static(nc, "XLAT_V").values
+            dy = np.diff(lat_v, axis=0)
+        else:
+            lat_v = None
+            dy = np.diff(lat, axis=0).mean()
+
+        if "XLONG_U" in nc:
+            dx = np.diff(static(nc, "XLONG_U").values, axis=1)
+        else:
+            dx = np.diff(static(nc, "XLONG").values, axis=1).mean()
+
+        area = radius * radius * d2r(dx) * d2r(dy) * np.cos(d2r(lat))
+
+        self.lat = xarray.DataArray(lat, dims=dims)
+        self.area = xarray.DataArray(area, dims=dims)
+        self.total_area = float(area.sum())
+        if lat_v is not None:
+            band = np.sin(d2r(lat_v[1:])) - np.sin(d2r(lat_v[:-1]))
+            zonal_area = radius * radius * 2 * np.pi * band / lat.shape[-1]
+            self.zonal_area = xarray.DataArray(zonal_area, dims=dims)
+        self._bands = dict()
+
+    @property
+    def shape(self):
+        return self.area.shape
+
+    def latitude_rows(self, south, north):
+        """Indices of the rows with south <= latitude < north."""
+        lat = self.lat.values[:, 0]
+        return np.where((lat >= south) & (lat < north))[0]
+
+    def rows_area(self, rows):
+        """Total area of a contiguous slice of rows (see band_rows), cached."""
+        key = (rows.start, rows.stop)
+        if key not in self._bands:
+            self._bands[key] = float(self.area.values[rows].sum())
+        return self._bands[key]
+
+
+def grid_geometry(nc):
+    """Return the (cached) GridGeometry for the grid of this dataset."""
+    key = grid_key(nc)
+    if key in _cache:
+        _cache.move_to_end(key)
+        return _cache[key]
+    geometry = GridGeometry(nc, key=key)
+    _cache[key] = geometry
+    while len(_cache) > MAX_GRIDS:
+        _cache.popitem(last=False)
+    return geometry
@@ -0,0 +1,182 @@
+"""Open a whole run of wrfout files as one lazy dataset.
+
+A run manifest, built from the JSON file list written by wrf.common._index,
+records every file's size, mtime, record count and offset along Time,
+together with the variables' dims, shapes, dtypes and attributes and the
+global attributes of the run. Opening the run then only builds dask
+arrays, chunked by the record counts (one chunk per file along Time),
+without reading any file; each
+chunk is read through the shared pool of open handles when computed.
+Manifests named *.run.json can be given to utils.open_dataset.
+
+Needs dask.
+"""
+import json
+import os
+import numpy as np
+import xarray
+from . import utils
+
+TIME = "Time"
+
+
+def _require_dask():
+    try:
+        import dask.array
+    except ImportError:
+        raise ImportError("Opening a run manifest needs dask, e.g. pip install dask")
+    return dask
+
+
+def _jsonable(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, bytes):
+        return value.decode("utf-8")
+    return value
+
+
+def _describe(nc):
+    """Variables, coordinate names and global attributes of an open file."""
+    variables = dict()
+    for name, var in nc.variables.items():
+        variables[name] = dict(
+            dims=list(var.dims),
+            shape=list(var.shape),
+            dtype=str(var.dtype),
+            attrs=dict((k, _jsonable(v)) for k, v in var.attrs.items()),
+        )
+    attrs = dict((k, _jsonable(v)) for k, v in nc.attrs.items())
+    return variables, sorted(nc.coords), attrs
+
+
+def _static_shape(description):
+    return [size for dim, size in zip(description["dims"], description["shape"]) if dim != TIME]
+
+
+class RunManifest(object):
+    """Per-file layout of a run, stored as JSON.
+
+    Args:
+        filename : JSON file holding the manifest, read if it exists
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.files = []
+        self.variables = dict()
+        self.coords = []
+        self.attrs = dict()
+        if os.path.exists(filename):
+            with open(filename, "r") as f:
+                content = json.load(f)
+            self.files = content["files"]
+            self.variables = content["variables"]
+            self.coords = content["coords"]
+            self.attrs = content["attrs"]
+
+    @property
+    def records(self):
+        return sum(f["records"] for f in self.files)
+
+    def update(self, paths):
+        """Lay out the run from paths, in Time order.
+
+        Files whose size and mtime match their previous entry are not opened.
+        Every file must hold the same variables with the same non-Time shapes.
+
+        Returns:
+            list of the paths that were opened
+        """
+        previous = dict((f["path"], f) for f in self.files)
+        files, opened = [], []
+        offset = 0
+        for path in paths:
+            stat = os.stat(path)
+            entry = previous.get(path)
+            if entry is None or entry["size"] != stat.st_size or entry["mtime"] != stat.st_mtime:
+                with utils.open_dataset(path) as nc:
+                    variables, coords, attrs = _describe(nc)
+                    records = int(nc.sizes.get(TIME, 0))
+                if not self.variables:
+                    self.variables, self.coords, self.attrs = variables, coords, attrs
+                self._check(path, variables)
+                entry = dict(path=path, size=stat.st_size, mtime=stat.st_mtime, records=records)
+                opened.append(path)
+            entry = dict(entry, offset=offset)
+            offset += entry["records"]
+            files.append(entry)
+        self.files = files
+        return opened
+
+    def _check(self, path, variables):
+        for name, description in self.variables.items():
+            if name not in variables:
+                raise ValueError("Variable {} is missing from {}".format(name, path))
+            if _static_shape(variables[name]) != _static_shape(description):
+                raise ValueError("Variable {} in {} has shape {}, expected {}".format(
+                    name, path, variables[name]["shape"], description["shape"]))
+
+    def save(self):
+        utils.write_json(self.filename, dict(files=self.files, variables=self.variables,
+                                             coords=self.coords, attrs=self.attrs), indent=2)
+
+    def open(self):
+        """The run as one lazy dataset concatenated along Time.
+
+        Raises ValueError if the manifest lists no files.
+        """
+        if not self.files:
+            raise ValueError("The run manifest {} lists no files".format(self.filename))
+        dask = _require_dask()
+        data = dict()
+        for name, description in self.variables.items():
+            dtype = np.dtype(description["dtype"])
+            if TIME not in description["dims"]:
+                chunk = dask.delayed(_read)(self.files[0]["path"], name)
+                data[name] = dask.array.from_delayed(chunk, tuple(description["shape"]), dtype)
+                continue
+            axis = description["dims"].index(TIME)
+            chunks = []
+            for f in self.files:
+                shape = list(description["shape"])
+                shape[axis] = f["records"]
+                chunk = dask.delayed(_read)(f["path"], name)
+                chunks.append(dask.array.from_delayed(chunk, tuple(shape), dtype))
+            data[name] = dask.array.concatenate(chunks, axis=axis)
+
+        ds = xarray.Dataset(
+            dict((name, xarray.Variable(description["dims"], data[name], description["attrs"]))
+                 for name, description in self.variables.items()),
+            attrs=self.attrs)
+        return ds.set_coords([c for c in self.coords if c in ds.variables])
+
+
+def _read(path, name):
+    with utils.open_dataset(path) as nc:
+        return nc[name].values
+
+
+def build_run_manifest(index_filename, manifest_filename=None):
+    """Create or refresh the run manifest for the wrfout files of an index.
+
+    Args:
+        index_filename : JSON file list written by wrf.common._index
+        manifest_filename : default index_filename + utils.RUN_SUFFIX
+    Returns:
+        the RunManifest
+    """
+    manifest = RunManifest(manifest_filename or index_filename + utils.RUN_SUFFIX)
+    manifest.update(utils.collection_files(index_filename))
+    manifest.save()
+    return manifest
+
+
+def open_run(manifest_filename):
+    """Open the run described by a manifest as one lazy dataset."""
+    if not os.path.exists(manifest_filename):
+        raise FileNotFoundError("No run manifest {}, see build_run_manifest".format(
+            manifest_filename))
+    return RunManifest(manifest_filename).open()
@@ -1,5 +1,7 @@
 import os
+import threading
 import numpy as np
+from collections import OrderedDict
 from contextlib import contextmanager
 import xarray
 
@@ -10,24 +12,159 @@ def add_prefix_to_filename(filename, prefix):
     return os.path.join(dirname, prefix + basename)
 
 
+def write_json(filename, content, **kwargs):
+    """Write content to a JSON file, creating its directory.
+
+    The file is written to a temporary file and renamed in place, so readers
+    never see a partial file. kwargs are passed to json.dump.
+    """
+    import json
+
+    directory = os.path.dirname(filename)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory, exist_ok=True)
+    tmp = filename + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(content, f, **kwargs)
+    os.replace(tmp, filename)
+
+
+def collection_files(index_filename, stream="wrfout"):
+    """List the files of a stream in the JSON file list written by wrf.common._index, with paths."""
+    import json
+
+    with open(index_filename, "r") as f:
+        filepaths = json.load(f)
+    root = filepaths.get("root")
+    return [f if root is None else os.path.join(root, f) for f in filepaths.get(stream, [])]
+
+
+class DatasetPool(object):
+    """Process-wide LRU pool of open datasets.
+
+    Handles are keyed by path, mtime and size, so a file that changes on disk
+    is opened afresh. Each acquire holds a reference; only handles nobody
+    holds are closed when the pool is over its size, and a handle replaced
+    while in use is closed on its last release. Forked processes start with
+    an empty pool rather than sharing the parent's file handles. Writers
+    must discard a path before writing to it, as HDF5 refuses to write to
+    a file that is still open for reading.
+
+    Args:
+        max_handles : number of idle handles to keep open
+    """
+
+    def __init__(self, max_handles=64):
+        self.max_handles = max_handles
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._handles = OrderedDict()  # key -> [dataset, references]
+        self._latest = dict()  # path -> key
+        self._retired = dict()  # key -> [dataset, references], replaced but in use
+
+    def __len__(self):
+        return len(self._handles)
+
+    @staticmethod
+    def key(path):
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        return (path, stat.st_mtime, stat.st_size)
+
+    def acquire(self, path):
+        """Return (key, dataset), opening path if it isn't pooled."""
+        key = self.key(path)
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            entry = self._handles.get(key)
+            if entry is None:
+                old = self._latest.get(key[0])
+                if old is not None:
+                    self._retire(old)
+                entry = [xarray.open_dataset(path), 0]
+                self._handles[key] = entry
+                self._latest[key[0]] = key
+            self._handles.move_to_end(key)
+            entry[1] += 1
+            self._evict()
+            return key, entry[0]
+
+    def release(self, key):
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            entry = self._handles.get(key)
+            if entry is not None:
+                entry[1] -= 1
+                self._evict()
+                return
+            entry = self._retired.get(key)
+            if entry is not None:
+                entry[1] -= 1
+                if entry[1] <= 0:
+                    del self._retired[key]
+                    entry[0].close()
+
+    def _retire(self, key):
+        entry = self._handles.pop(key)
+        del self._latest[key[0]]
+        if entry[1] > 0:
+            self._retired[key] = entry
+        else:
+            entry[0].close()
+
+    def _evict(self):
+        idle = [key for key, entry in self._handles.items() if entry[1] <= 0]
+        for key in idle[:max(len(self._handles) - self.max_handles, 0)]:
+            self._retire(key)
+
+    def discard(self, path):
+        """Close and forget the handle of path; if it is in use, on its last release."""
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            key = self._latest.get(os.path.abspath(path))
+            if key is not None:
+                self._retire(key)
+
+    def clear(self):
+        """Close every idle handle."""
+        with self._lock:
+            for key in [key for key, entry in self._handles.items() if entry[1] <= 0]:
+                self._retire(key)
+
+
+POOL = DatasetPool()
+RUN_SUFFIX = ".run.json"
+
+
 @contextmanager
 def open_dataset(fh,aggdim="Time"):
-    """opens a file if the name is supplied, or transparently returns a filehandle"""
-    if isinstance(fh,str):
-        try: 
-            ff=xarray.open_dataset(fh)
-            yield ff
+    """opens a file if the name is supplied, or transparently returns a filehandle
+
+    Files are drawn from the shared POOL of open handles. Each caller gets a
+    shallow copy, so loading or adding variables doesn't change the pooled
+    dataset. A run manifest (see core.run) opens the whole run lazily."""
+    if isinstance(fh,str) and fh.endswith(RUN_SUFFIX):
+        from .run import open_run
+        yield open_run(fh)
+    elif isinstance(fh,str):
+        key, ff = POOL.acquire(fh)
+        try:
+            yield ff.copy(deep=False)
         finally:
-            ff.close()
+            POOL.release(key)
     elif isinstance(fh,list):
+        ff=xarray.open_mfdataset(fh,concat_dim=aggdim,combine="nested")
         try:
-            ff=xarray.open_mfdataset(fh,aggdim="Time")
             yield ff
         finally:
             ff.close()
-        yield fh
     elif isinstance(fh,xarray.Dataset):
         yield fh
     else:
         raise Exception("No filename or filehandle given {0}".format(fh))
-    
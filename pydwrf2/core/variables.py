@@ -1,5 +1,6 @@
 import xarray
 import numpy as np
+from .geometry import grid_geometry
 
 def either(*args):
     def access(nc):
@@ -31,21 +32,5 @@ def continuous_ls(ls, threshold=-100):
     return np.hstack([i*360+ls[s] for i,s in enumerate(slice_ls(ls, threshold))])
     
 def area(nc):
-    if "XLAT_V" in nc:
-        dy = (
-            nc["XLAT_V"][:]
-            .diff("south_north_stag")
-            .rename(dict(south_north_stag="south_north"))
-        )
-    else:
-        dy = nc["XLAT_V"][:].diff("south_north").mean()
-
-    if "XLONG_U" in nc:
-        dx = nc["XLONG_U"][:].diff("west_east_stag").rename(dict(west_east_stag="west_east"))
-    else:
-        dx = nc["XLONG_U"][:].diff("west_east").mean()
-
-    y = nc["XLAT"]
-    d2r = np.deg2rad
-    area = nc.RADIUS * nc.RADIUS * d2r(dx) * d2r(dy) * np.cos(d2r(y))
-    return area
+    """Cell areas of the grid (south_north, west_east), from the geometry cache."""
+    return grid_geometry(nc).area
@@ -0,0 +1,136 @@
+"""Mergeable running statistics for the database aggregation.
+
+Each file is folded into fixed-size accumulators indexed by local hour and
+then discarded, so memory does not grow with the number of files.
+
+The variance is carried as a count, mean and sum of squared deviations
+(M2) in double precision and combined with the pairwise update of Chan et
+al., which stays accurate for large-mean fields where E[x^2] - E[x]^2
+cancels catastrophically.
+"""
+import numpy as np
+import xarray
+
+STATISTICS = ["count", "mean", "m2", "min", "max"]
+
+
+def suffix(xa, suffix):
+    names = dict(zip(xa.variables,
+                                ("{}{}".format(k,suffix) for k in xa.variables)))
+    if "hour" in names:
+        del names["hour"]
+    return xa.rename( names )
+
+
+class HourlyAccumulator(object):
+    """Running count, mean, M2, min and max per local hour.
+
+    Args:
+        hours : every local hour that can appear, fixes the accumulator size
+    """
+
+    def __init__(self, hours):
+        self.hours = np.sort(np.unique(np.asarray(hours)))
+        self.state = None
+
+    def partial(self, data):
+        """Per-hour statistics of one block of data.
+
+        The block mean and M2 are computed in two passes over the block in
+        double precision.
+
+        Args:
+            data : Dataset with a Time dimension and an "hour" variable
+        """
+        data = data.set_coords("hour")
+        g = data.groupby("hour")
+        wide = data.astype(np.float64).groupby("hour")
+        mean = wide.mean("Time")
+        anomaly = wide - mean
+        partial = dict(
+            count=g.count("Time"),
+            mean=mean,
+            m2=(anomaly * anomaly).groupby("hour").sum("Time"),
+            min=g.min("Time"),
+            max=g.max("Time"),
+        )
+        fill = dict(count=0, mean=0, m2=0, min=np.nan, max=np.nan)
+        partial = dict(
+            (k, v.reindex(hour=self.hours, fill_value=fill[k])) for k, v in partial.items()
+        )
+        # hours with no valid values have a NaN mean
+        partial["mean"] = partial["mean"].fillna(0)
+        return partial
+
+    def update(self, data):
+        """Fold a block of data into the running statistics."""
+        self.combine(self.partial(data))
+        return self
+
+    def merge(self, other):
+        """Fold the statistics of another accumulator into this one."""
+        if other.state is not None:
+            self.combine(other.state)
+        return self
+
+    def combine(self, partial):
+        if self.state is None:
+            self.state = partial
+            return
+        state = self.state
+        na, nb = state["count"], partial["count"]
+        n = na + nb
+        # n is zero where neither side has data; use 1 to avoid dividing by it
+        safe_n = n.where(n > 0, 1)
+        delta = partial["mean"] - state["mean"]
+        self.state = dict(
+            count=n,
+            mean=state["mean"] + delta * nb / safe_n,
+            m2=state["m2"] + partial["m2"] + delta * delta * na * nb / safe_n,
+            min=np.fmin(state["min"], partial["min"]),
+            max=np.fmax(state["max"], partial["max"]),
+        )
+
+    def mean(self):
+        count = self.state["count"]
+        return self.state["mean"].where(count > 0)
+
+    def variance(self):
+        """Population variance."""
+        count = self.state["count"]
+        return (self.state["m2"] / count).where(count > 0)
+
+    def result(self, aggregation):
+        """Dataset of the requested statistics (mean, std, max, min), with
+        the statistic appended to each variable name."""
+        total = xarray.Dataset()
+        if self.state is None:
+            return total
+
+        if "mean" in aggregation:
+            total = total.merge(suffix(self.mean(), "_mean"))
+
+        if "std" in aggregation:
+            total_std = np.sqrt(self.variance())
+            total = total.merge(suffix(total_std, "_std"))
+
+        if "max" in aggregation:
+            total = total.merge(suffix(self.state["max"], "_max"))
+
+        if "min" in aggregation:
+            total = total.merge(suffix(self.state["min"], "_min"))
+
+        return total
+
+
+def tree_merge(accumulators):
+    """Merge a list of accumulators pairwise, level by level."""
+    accumulators = list(accumulators)
+    if not accumulators:
+        return None
+    while len(accumulators) > 1:
+        merged = [a.merge(b) for a, b in zip(accumulators[0::2], accumulators[1::2])]
+        if len(accumulators) % 2:
+            merged.append(accumulators[-1])
+        accumulators = merged
+    return accumulators[0]
@@ -5,100 +5,135 @@ import os
 import numpy as np
 from tqdm import tqdm
 from ..wrf import dates
+from ..core import derived, utils
+from .accumulators import HourlyAccumulator, tree_merge
+from .manifest import Manifest, fingerprint
+from .summary import SummaryStore
+from . import storage, ls_index
 import logging
 
 
-def write_if_changed(dataframe, filename, index_label="Times"):
-    """Write the pandas dataframe only if it's different to the file."""
+def digest_filename(filename):
+    """Sidecar file holding the content digest of an index table."""
+    return filename + ".sha1"
 
-    old_df = None
-    if os.path.exists(filename):
-        old_df = pd.read_csv(filename, index_col=0)
-        old_mtime = os.path.getmtime(filename)
 
-    update_file = True
-    if old_df is not None and dataframe.index.equals(old_df.index):
-        update_file = False
+def write_if_changed(dataframe, filename, index_label="Times"):
+    """Write the pandas dataframe only if it's different to the file.
 
-    if update_file:
-        print("Updating {}".format(filename))
-        directory = os.path.dirname(filename)
-        if directory is not "" and not os.path.exists(directory):
-            os.makedirs(directory, exist_ok=True)
-        dataframe.to_csv(filename, index_label=index_label)
+    The content digest of the last write is kept in a sidecar next to the
+    file, with a fingerprint of the file itself, so the old table is never
+    parsed. Updates are written to a temporary file and renamed in place.
+    The table is written with the canonical dtypes, so that it hashes the
+    same when it is read back.
 
+    Returns:
+        True if the file was written
+    """
+    dataframe = storage.canonical(dataframe)
+    digest = storage.content_digest(dataframe, index_label)
+    sidecar = digest_filename(filename)
+    if os.path.exists(filename) and os.path.exists(sidecar):
+        with open(sidecar, "r") as f:
+            old = json.load(f)
+        if old.get("digest") == digest and old.get("fingerprint") == fingerprint(filename):
+            return False
+
+    print("Updating {}".format(filename))
+    directory = os.path.dirname(filename)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory, exist_ok=True)
+    root, extension = os.path.splitext(filename)
+    tmp = root + ".tmp" + extension
+    storage.write_index(dataframe, tmp, index_label=index_label)
+    os.replace(tmp, filename)
+    with open(sidecar + ".tmp", "w") as f:
+        json.dump(dict(digest=digest, fingerprint=fingerprint(filename)), f)
+    os.replace(sidecar + ".tmp", sidecar)
+    return True
+
+
+def time_runs(counters):
+    """Split record indices into (start, stop) runs of consecutive records.
+
+    The indices are sorted and repeats dropped first, so every record is
+    read once and in file order.
+    """
+    counters = np.unique(np.asarray(counters, dtype=int))
+    if counters.size == 0:
+        return []
+    breaks = np.nonzero(np.diff(counters) != 1)[0] + 1
+    starts = np.hstack([0, breaks])
+    stops = np.hstack([breaks, counters.size])
+    return [(int(counters[a]), int(counters[b - 1]) + 1) for a, b in zip(starts, stops)]
 
-def sumsquare(d, axis=None):
-    return np.mean(np.multiply(d, d), axis)
 
+def read_records(filename, variables, counters):
+    """Read the selected time records of variables from a wrfout file.
 
-def suffix(xa, suffix):
-    names = dict(zip(xa.variables,
-                                ("{}{}".format(k,suffix) for k in xa.variables)))
-    if "hour" in names:
-        del names["hour"]
-    return xa.rename( names )
+    Only the records listed in counters are read, in file order, one block
+    read per run of consecutive records, before the local "hour" and any derived variables
+    (see core.derived) are computed on that subset.
+    """
+    with xarray.open_dataset(filename) as nc:
+        names = [v for v in variables if v != "hour"]
+        inputs = derived.requirements(["Times"] + names, available=nc.variables)
+        subset = nc[inputs]
+        blocks = [subset.isel(Time=slice(a, b)) for a, b in time_runs(counters)]
+        if len(blocks) == 1:
+            data = blocks[0].load()
+        else:
+            data = xarray.concat(blocks, dim="Time").load()
+
+    data["hour"] = xarray.DataArray(dates.get_hours(data["Times"]), dims="Time")
+    view = derived.Derived(data)
+    for v in names:
+        if v not in data.variables:
+            data[v] = view[v]
+
+    return data[variables].reset_coords()
+
+
+def _aggregate_files(task):
+    """Worker for aggregate: accumulate a subset of the files."""
+    files, variables, hours = task
+    accumulator = HourlyAccumulator(hours)
+    for filename, counters in files:
+        accumulator.update(read_records(filename, variables, counters))
+    return accumulator
+
+
+def aggregate(variable, index_filename, output_filename, aggregation, processes=1):
+    """Dumb average of data
+
+    Each file is folded into running per-hour statistics and discarded, so
+    memory use does not depend on the number of files. With processes > 1
+    subsets of the files are accumulated by worker processes and the
+    partial statistics are merged pairwise.
+    """
+    index = storage.read_index(index_filename, columns=["Filename", "File_Counter", "Hour"])
+    hours = index["Hour"].unique()
 
+    vv = variable.split(",") + ["hour"]
+    files = [(filename, local_df["File_Counter"].values)
+             for filename, local_df in index.groupby("Filename", sort=False)]
 
-def aggregate(variable, index_filename, output_filename, aggregation):
-    """Dumb average of data"""
-    index = pd.read_csv(index_filename, index_col=0)
-    local_time_dimension = index["Hour"].unique()
-    data = []
-    ntime = len(local_time_dimension)
+    if processes is not None and processes <= 1:
+        accumulator = HourlyAccumulator(hours)
+        for filename, counters in tqdm(files):
+            accumulator.update(read_records(filename, vv, counters))
+    else:
+        from concurrent.futures import ProcessPoolExecutor
 
-    vv = variable.split(",") + ["hour"]
-    
-    for filename in tqdm(index["Filename"].unique()):
-        local_df = index[index["Filename"]==filename]
-        nc = xarray.open_dataset(filename)
-        nc["hour"] = xarray.DataArray(dates.get_hours(nc["Times"]), dims="Time")
-        if "PRES" in vv:
-            nc["PRES"] = nc["P"] + nc["PB"]
-        if "TEMP" in vv:
-            nc["TEMP"] = (nc["T"] + nc.T0)*((nc["P"]+nc["PB"])/nc.P0)**(nc.R_D/nc.CP)
-
-        mydata = nc[vv].isel(Time=local_df["File_Counter"]).reset_coords()
-        g = mydata.groupby("hour")
-        data.append(dict(sum=g.sum(["Time"]),
-                         count=g.count(["Time"]),
-                         max=g.max(["Time"]),
-                         min=g.min(["Time"]),
-                         sqs=g.reduce(sumsquare, dim=["Time"])))
-
-  
-    total_count = xarray.concat((d["count"] for d in data),dim="ensemble").groupby("hour").sum("ensemble")
-    total = xarray.Dataset()
-   
-    if "mean" in aggregation:
-        total_mean = xarray.concat((d["sum"]/total_count for d in data),dim="ensemble").groupby("hour").sum("ensemble")
-        total = total.merge(suffix(total_mean,"_mean"))
-
-    if "std" in aggregation:
-        if "mean" not in aggregation:
-            total_mean = xarray.concat((d["sum"]/total_count for d in data),dim="ensemble").groupby("hour").sum("ensemble")
-        total_std = xarray.concat((d["sqs"]/total_count for d in data),dim="ensemble").groupby("hour").sum("ensemble")
-        total_std = (total_std - total_mean**2)*0.5
-        
-        total = total.merge(suffix(total_std,"_std"))
-
-    if "max" in aggregation:
-        #max
-        group_max = (xarray.concat((d["max"] for d in data),dim="ensemble").
-                     groupby("hour").
-                     max("ensemble"))
-        
-        total = total.merge(suffix(group_max,"_max"))
-
-    if "min" in aggregation:
-        #min
-        group_min = (xarray.concat((d["min"] for d in data),dim="ensemble").
-                     groupby("hour").
-                     max("ensemble"))
-
-        total = total.merge(suffix(group_min,"_min"))
-
-    total.to_netcdf(output_filename)
+        # several tasks per worker to even out the load
+        ntasks = min(len(files), 4 * (processes or os.cpu_count()))
+        tasks = [(files[i::ntasks], vv, hours) for i in range(ntasks)]
+        with ProcessPoolExecutor(processes) as executor:
+            partials = list(tqdm(executor.map(_aggregate_files, tasks), total=ntasks))
+        accumulator = tree_merge(partials) or HourlyAccumulator(hours)
+
+    utils.POOL.discard(output_filename)
+    accumulator.result(aggregation).to_netcdf(output_filename)
 
 
 def index_ls(low, high,
@@ -110,23 +145,71 @@ def index_ls(low, high,
 
     This file acts as a gateway to remaking a database file.
     """
-    df = pd.read_csv(database_filename, index_col=0)
+    # whole sols need records outside the window, so only a partial sol
+    # read can be limited to the rows in the window; L_S == 360 is treated as 0
+    filters = ls_index.window_filters(low, high) if partial_sol else None
+    df = storage.read_index(database_filename, filters=filters)
+    df = ls_index.LsIndex(df).select(low, high, partial_sol)
+    write_window(df, low, high, database_filename, database_ls_prefix, format_string)
+
+
+def write_window(df, low, high, database_filename, database_ls_prefix, format_string):
+    """Write the rows of one L_S window, in the format of the database file."""
+    df = df.copy()
     # reset the extreme ls values
+    df.loc[df["L_S"] == 360.0, "L_S"] = 0.0
 
-    df.at[df["L_S"] == 360.0, "L_S"] = 0.0
-    if low > high:
-        select = ((df["L_S"] >= low) & (df["L_S"] < 360.0) |
-                 (df["L_S"] >= 0.0) & (df["L_S"] < high))
-    else:
-        select = (df["L_S"] >= low) & (df["L_S"] < high)
+    extension = os.path.splitext(database_filename)[1] or ".csv"
+    filename = database_ls_prefix + "-{}-{}{}".format(format(low,format_string),
+                                                      format(high,format_string),
+                                                      extension)
+    write_if_changed(df, filename)
+    return filename
 
-    if not partial_sol:
-        for sol in df["Sol"][select].unique():
-            select = select | (df["Sol"] == sol)
 
-    filename = database_ls_prefix + "-{}-{}.csv".format(format(low,format_string),
-                                                        format(high,format_string))
-    write_if_changed(df[select], filename)
+def ls_windows(width, step=None, overlap=0.0, start=0.0, wrap=True):
+    """List the (low, high) L_S windows covering one year.
+
+    Args:
+        width : width of each window (degrees)
+        step : distance between window starts, default width - overlap
+        overlap : overlap between neighbouring windows, used if step is None
+        start : L_S of the first window
+        wrap : windows past 360 wrap around to 0, otherwise they stop at 360
+    """
+    step = step or (width - overlap)
+    if step <= 0:
+        raise ValueError("The window step must be positive")
+    windows = []
+    for low in start + step * np.arange(int(np.ceil(360.0 / step))):
+        low = low % 360.0
+        high = low + width
+        if high > 360.0:
+            high = high - 360.0 if wrap else 360.0
+        windows.append((float(low), float(high)))
+    return windows
+
+
+def index_ls_batch(width, step=None, overlap=0.0, start=0.0, wrap=True,
+    database_filename="output/database/database_index.csv",
+    database_ls_prefix="output/database/database-ls",
+    partial_sol=True,
+    format_string="05.1f"):
+    """Create every L_S specific index of a window specification in one pass.
+
+    The database index is read and sorted once; each window file is only
+    rewritten if its contents changed. See ls_windows for the arguments.
+
+    Returns:
+        list of the window filenames
+    """
+    df = storage.read_index(database_filename)
+    index = ls_index.LsIndex(df)
+    filenames = []
+    for low, high in ls_windows(width, step, overlap, start, wrap):
+        filenames.append(write_window(index.select(low, high, partial_sol), low, high,
+                                      database_filename, database_ls_prefix, format_string))
+    return filenames
 
 
 
@@ -142,22 +225,26 @@ def _index_one_file(filename, source_filename=None):
         "Minute",
         "Second",
     ]
-    result = []
-    if filename is not None:
-        nc = xarray.open_dataset(filename)
-        ls = nc["L_S"]
-        times = nc["Times"]
-        date = dates.parse_dates(times)
-        file_counter = 0
-        for l, t, d in zip(ls.values, times.values, date):
-            myr = [file_counter, filename, l, t.decode("utf-8")]
-            if source_filename is not None:
-                myr[1] = source_filename
-            myr.extend(d)
-            result.append(myr)
-            file_counter += 1
-    df = pd.DataFrame(result, columns=columns).set_index("Times")
-    return df
+    if filename is None:
+        # typed, so that concatenating it doesn't turn every column to object
+        return storage.canonical(pd.DataFrame([], columns=columns).set_index("Times"))
+
+    with xarray.open_dataset(filename) as nc:
+        ls = nc["L_S"].values
+        times = nc["Times"].values
+    date = dates.parse_dates(times)
+    df = pd.DataFrame(
+        dict(
+            File_Counter=np.arange(len(times)),
+            Filename=source_filename if source_filename is not None else filename,
+            L_S=ls,
+            Times=times.astype(str),
+        ),
+        columns=columns[:4],
+    )
+    for k, name in enumerate(columns[4:]):
+        df[name] = date[:, k]
+    return df.set_index("Times")
 
 
 def index_one_file(filename, output_filename):
@@ -165,59 +252,81 @@ def index_one_file(filename, output_filename):
     write_if_changed(table, output_filename)
 
 
+def _first_file_wins(df, filenames):
+    """Drop duplicate Times, keeping the row of the earliest file in filenames.
+
+    Rows of files missing from filenames lose to every listed file, so the
+    owner of a shared time depends only on the file order, not on which
+    files were rescanned.
+    """
+    order = dict((filename, k) for k, filename in enumerate(filenames))
+    rank = df["Filename"].map(order).fillna(len(order)).values
+    position = np.lexsort((rank, df.index.values.astype(str)))
+    df = df.iloc[position]
+    return df.loc[~df.index.duplicated(keep="first")]
+
+
 def index(index_filename="output/index",
     database_filename="output/database/database_index.csv",
-    intermediate="output/intermediate"):
+    intermediate="output/intermediate",
+    manifest_filename=None):
     """Create a new index file for the database.
 
     Each line includes an index number into each file from the entire wrfout collection
-    and the L_S and local time of that index."""
+    and the L_S and local time of that index.
+
+    Only files that are new or changed since the last run, according to the
+    manifest (default database_filename + ".manifest.json"), are opened, and
+    their rows replace any previous rows for the same file. A time held by
+    several files is indexed from the earliest of them in the file list."""
 
     # 1. Load the JSON file that contains the wrfout files that we are indexing
     import json
-    import xarray
-    import pandas as pd
-    from tqdm import tqdm
-
 
-    filepaths = json.load(open(index_filename, "r"))
+    with open(index_filename, "r") as f:
+        filepaths = json.load(f)
+    manifest = Manifest(manifest_filename or database_filename + ".manifest.json")
     old_df = _index_one_file(None)
-    old_mtime = 0
 
     if os.path.exists(database_filename):
-        old_df = pd.read_csv(database_filename, index_col=0)
-        old_mtime = os.path.getmtime(database_filename)
+        old_df = storage.read_index(database_filename)
+    indexed = set(old_df["Filename"].unique())
+
     result = []
-    # counter=0
-    # 2. Loop through the wrfout files
+    # 2. Loop through the wrfout files, skipping those already indexed and unchanged
     for filename in tqdm(filepaths.get("wrfout", [])):
         ls_filename = os.path.join(intermediate,os.path.basename(filename)+".ls")
-        if old_mtime > os.path.getmtime(ls_filename) and ls_filename in old_df["Filename"]:
-            print("Found unmodified data")
+        if filename in indexed and not manifest.changed(ls_filename):
             continue
         # 2.a Load the file
-        myr = _index_one_file(ls_filename, source_filename=filename)
-        result.append(myr)
-    df = pd.concat(result)
-        
-    # 3. Check for the old database file
-    # 4. Compare the two database files
-    update_file = True
-
-    if len(old_df):
-        new_df = pd.concat([old_df, df])
-        new_df = new_df.loc[~new_df.index.duplicated(keep="first")]
-    else:
-        new_df = df.copy()
-
-    if old_df is not None and new_df.index.equals(old_df.index):
-        update_file = False
+        result.append(_index_one_file(ls_filename, source_filename=filename))
+        manifest.record(ls_filename)
+
+    # 3. Splice the new rows into the old index
+    if result:
+        df = pd.concat(result)
+        rescanned = set(df["Filename"].unique())
+        new_df = pd.concat([old_df[~old_df["Filename"].isin(rescanned)], df])
+        new_df = _first_file_wins(new_df, filepaths.get("wrfout", [])).sort_index()
+        # 4. If the data is modified, write a new file
+        write_if_changed(new_df, database_filename)
+    manifest.save()
+
+
+def summarise(index_filename="output/index",
+    summary_filename="output/database/summary.json",
+    threads=None):
+    """Summarise the new or changed wrfout files of the collection.
+
+    Returns:
+        the SummaryStore
+    """
+    store = SummaryStore(summary_filename)
+    store.update(utils.collection_files(index_filename), threads=threads)
+    store.save()
+    return store
 
-    # 5. If the data is modified, write a new file
 
-    if update_file:
-        print("Updating database index file")
-        directory = os.path.dirname(database_filename)
-        if directory is not "" and not os.path.exists(directory):
-            os.makedirs(directory, exist_ok=True)
-        new_df.to_csv(database_filename, index_label="Times")
+def files_covering(low, high, summary_filename="output/database/summary.json"):
+    """List the summarised files whose L_S range overlaps [low, high]."""
+    return SummaryStore(summary_filename).covering(low, high)
@@ -0,0 +1,77 @@
+"""Sorted L_S index for fast window queries on a database index table."""
+import numpy as np
+
+
+def window_filters(low, high):
+    """Row filters (see storage) for the L_S window [low, high).
+
+    A window with low > high wraps through 360. L_S == 360 is treated as 0.
+    """
+    if low > high:
+        filters = [[("L_S", ">=", low), ("L_S", "<", 360.0)],
+                   [("L_S", ">=", 0.0), ("L_S", "<", high)]]
+    else:
+        filters = [[("L_S", ">=", low), ("L_S", "<", high)]]
+    if low > high or low <= 0.0:
+        filters.append([("L_S", "==", 360.0)])
+    return filters
+
+
+class LsIndex(object):
+    """Answer L_S window and whole-sol queries by binary search.
+
+    The rows are sorted once by L_S (360 counted as 0) and once by Sol, so a
+    window is one or two searchsorted ranges and expanding it to whole sols
+    is a concatenation of precomputed row ranges.
+
+    Args:
+        df : index table with L_S and Sol columns
+    """
+
+    def __init__(self, df):
+        self.df = df
+        ls = df["L_S"].values.astype(float)
+        ls = np.where(ls == 360.0, 0.0, ls)
+        self.ls_order = np.argsort(ls, kind="stable")
+        self.sorted_ls = ls[self.ls_order]
+
+        sol = df["Sol"].values
+        self.sol_order = np.argsort(sol, kind="stable")
+        self.sols, self.sol_start = np.unique(sol[self.sol_order], return_index=True)
+        self.sol_stop = np.hstack([self.sol_start[1:], len(sol)])
+
+    def _range(self, low, high):
+        start, stop = np.searchsorted(self.sorted_ls, [low, high], side="left")
+        return self.ls_order[start:stop]
+
+    def window_rows(self, low, high):
+        """Row positions with low <= L_S < high, wrapping through 360 if low > high."""
+        if low > high:
+            rows = np.hstack([self._range(low, 360.0), self._range(0.0, high)])
+        else:
+            rows = self._range(low, high)
+        return np.sort(rows)
+
+    def sol_rows(self, sols):
+        """Row positions of every record in the given sols."""
+        sols = np.unique(sols)
+        where = np.searchsorted(self.sols, sols)
+        found = where < self.sols.size
+        where = where[found]
+        where = where[self.sols[where] == sols[found]]
+        if where.size == 0:
+            return np.array([], dtype=int)
+        ranges = [self.sol_order[self.sol_start[i]:self.sol_stop[i]] for i in where]
+        return np.sort(np.hstack(ranges))
+
+    def select(self, low, high, partial_sol=True):
+        """Rows of the table in the L_S window, in table order.
+
+        With partial_sol False, every record of each sol touched by the
+        window is included.
+        """
+        rows = self.window_rows(low, high)
+        if not partial_sol:
+            sols = np.unique(self.df["Sol"].values[rows])
+            rows = self.sol_rows(sols)
+        return self.df.iloc[rows]
@@ -0,0 +1,75 @@
+"""Persistent record of the files that went into a database index.
+
+For every file the manifest keeps its size, modification time and a
+content fingerprint, so that re-indexing only opens new or changed files.
+"""
+import hashlib
+import json
+import os
+from ..core import utils
+
+FINGERPRINT_BLOCK = 1 << 16
+
+
+def fingerprint(path, block=FINGERPRINT_BLOCK):
+    """Cheap content fingerprint: sha1 of the size and the first and last blocks."""
+    size = os.path.getsize(path)
+    digest = hashlib.sha1(str(size).encode("utf-8"))
+    with open(path, "rb") as f:
+        digest.update(f.read(block))
+        if size > block:
+            f.seek(max(size - block, block))
+            digest.update(f.read(block))
+    return digest.hexdigest()
+
+
+class Manifest(object):
+    """Per-file size, mtime and fingerprint, stored as JSON.
+
+    Args:
+        filename : JSON file holding the manifest, read if it exists
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.entries = dict()
+        if os.path.exists(filename):
+            with open(filename, "r") as f:
+                self.entries = json.load(f)
+        self.modified = False
+
+    def __contains__(self, path):
+        return path in self.entries
+
+    def changed(self, path):
+        """True if path is new or its content changed since it was recorded.
+
+        Files with the same size and mtime are not read. If only the mtime
+        changed the fingerprint decides, and the stat is refreshed.
+        """
+        entry = self.entries.get(path)
+        if entry is None:
+            return True
+        stat = os.stat(path)
+        if entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+            return False
+        if entry["size"] == stat.st_size and entry["fingerprint"] == fingerprint(path):
+            self.record(path, entry["fingerprint"])
+            return False
+        return True
+
+    def record(self, path, content_fingerprint=None):
+        """Record the current state of path."""
+        stat = os.stat(path)
+        self.entries[path] = dict(
+            size=stat.st_size,
+            mtime=stat.st_mtime,
+            fingerprint=content_fingerprint or fingerprint(path),
+        )
+        self.modified = True
+
+    def save(self):
+        if not self.modified:
+            return
+        utils.write_json(self.filename, self.entries, indent=2, sort_keys=True)
+        self.modified = False
@@ -0,0 +1,159 @@
+"""Read and write database index tables.
+
+The format follows the file extension: .csv (default), or the columnar
+.parquet and .feather formats, which need pyarrow. The columnar formats
+store typed numeric columns and dictionary encode the repeated filenames;
+Parquet also pushes row filters down to the reader.
+
+Filters use the pyarrow convention: a list of (column, op, value) tuples
+that must all hold, or a list of such lists, any of which may hold. The
+operators are ==, !=, <, <=, >, >= and in.
+
+content_digest hashes the table independently of the format, so a writer
+can tell whether a table changed without parsing the old file.
+"""
+import hashlib
+import os
+import operator
+import numpy as np
+import pandas as pd
+
+INDEX_LABEL = "Times"
+CATEGORICAL = ["Filename"]
+INTEGER = ["File_Counter", "Year", "Sol", "Hour", "Minute", "Second"]
+FLOAT = ["L_S"]
+
+_operators = {
+    "==": operator.eq,
+    "=": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda column, values: column.isin(values),
+}
+
+
+def index_format(filename):
+    """Storage format of an index file from its extension."""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension in [".parquet", ".pq"]:
+        return "parquet"
+    if extension in [".feather", ".arrow"]:
+        return "feather"
+    return "csv"
+
+
+def _require_pyarrow(fmt):
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError("The {} index format needs pyarrow installed".format(fmt))
+
+
+def _normalise_filters(filters):
+    """Return filters as a list of lists (OR of ANDs)."""
+    if not filters:
+        return None
+    if isinstance(filters[0], tuple):
+        return [list(filters)]
+    return [list(f) for f in filters]
+
+
+def apply_filters(df, filters):
+    """Select the rows of df matching filters."""
+    filters = _normalise_filters(filters)
+    if filters is None:
+        return df
+    select = np.zeros(len(df), dtype=bool)
+    for conjunction in filters:
+        term = np.ones(len(df), dtype=bool)
+        for column, op, value in conjunction:
+            if column == INDEX_LABEL and column not in df.columns:
+                data = df.index.to_series()
+            else:
+                data = df[column]
+            term &= np.asarray(_operators[op](data, value))
+        select |= term
+    return df[select]
+
+
+def read_index(filename, filters=None, columns=None):
+    """Read an index table, indexed by Times.
+
+    Args:
+        filename : csv, parquet or feather file
+        filters : row filters, see module documentation
+        columns : subset of the columns to read
+    """
+    fmt = index_format(filename)
+    if fmt == "csv":
+        df = pd.read_csv(filename, index_col=0, float_precision="round_trip")
+        if columns is not None:
+            df = df[columns]
+        return apply_filters(df, filters)
+
+    _require_pyarrow(fmt)
+    read_columns = None if columns is None else [INDEX_LABEL] + list(columns)
+    if fmt == "parquet":
+        df = pd.read_parquet(filename, columns=read_columns,
+                             filters=_normalise_filters(filters))
+    else:
+        df = apply_filters(pd.read_feather(filename, columns=read_columns), filters)
+    df = df.set_index(INDEX_LABEL)
+    for column in CATEGORICAL:
+        if column in df.columns:
+            df[column] = df[column].astype(str)
+    return df
+
+
+def columnar(dataframe, index_label=INDEX_LABEL):
+    """Typed, dictionary encoded frame ready for the columnar formats."""
+    df = dataframe.reset_index()
+    df = df.rename(columns={df.columns[0]: index_label})
+    for column in CATEGORICAL:
+        if column in df.columns:
+            df[column] = df[column].astype("category")
+    for column in INTEGER:
+        if column in df.columns:
+            df[column] = df[column].astype(np.int32)
+    return df
+
+
+def write_index(dataframe, filename, index_label=INDEX_LABEL):
+    """Write an index table in the format given by the extension."""
+    fmt = index_format(filename)
+    if fmt == "csv":
+        dataframe.to_csv(filename, index_label=index_label)
+        return
+    _require_pyarrow(fmt)
+    df = columnar(dataframe, index_label)
+    if fmt == "parquet":
+        df.to_parquet(filename, index=False)
+    else:
+        df.to_feather(filename)
+
+
+def canonical(dataframe):
+    """Index table with the standard dtypes: string Times and Filename,
+    int64 counters and float64 L_S, whatever the frame was built or read as."""
+    df = dataframe.copy()
+    df.index = df.index.astype(str)
+    for column in df.columns:
+        if column in CATEGORICAL:
+            df[column] = df[column].astype(str)
+        elif column in INTEGER:
+            df[column] = df[column].astype(np.int64)
+        elif column in FLOAT:
+            df[column] = df[column].astype(np.float64)
+    return df
+
+
+def content_digest(dataframe, index_label=INDEX_LABEL):
+    """sha1 of the column names and row hashes of the canonical table."""
+    df = canonical(dataframe).reset_index()
+    df = df.rename(columns={df.columns[0]: index_label})
+    digest = hashlib.sha1("\x1f".join(map(str, df.columns)).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()
@@ -0,0 +1,106 @@
+"""Per-file summaries of wrfout collections.
+
+One record per file holds its time span, L_S range, record count, variable
+shapes and dtypes, and grid fingerprint, so that files can be chosen
+without opening them. Records are refreshed when a file's size or mtime
+changes and the store is kept as JSON.
+"""
+import json
+import os
+import logging
+import xarray
+from ..core import geometry, utils
+from ..wrf import common
+
+
+def summarise(path):
+    """Summary record of a single file."""
+    stat = os.stat(path)
+    record = dict(size=stat.st_size, mtime=stat.st_mtime)
+    with xarray.open_dataset(path, decode_times=False) as nc:
+        record["records"] = int(nc.sizes.get("Time", 0))
+        record.update(common.sniff(nc))
+        if "first_L_S" in record:
+            ls = nc["L_S"].values
+            record["min_L_S"] = float(ls.min())
+            record["max_L_S"] = float(ls.max())
+        record["variables"] = dict(
+            (name, dict(dims=list(var.dims), shape=list(var.shape), dtype=str(var.dtype)))
+            for name, var in nc.variables.items())
+        record["grid"] = geometry.grid_key(nc)
+    return record
+
+
+def _ls_intervals(low, high):
+    """Split a possibly wrapping L_S range into non-wrapping intervals."""
+    if low > high:
+        return [(low, 360.0), (0.0, high)]
+    return [(low, high)]
+
+
+def _overlaps(a, b):
+    return any(lo1 <= hi2 and lo2 <= hi1 for lo1, hi1 in a for lo2, hi2 in b)
+
+
+class SummaryStore(object):
+    """Summary records keyed by file path, stored as JSON.
+
+    Args:
+        filename : JSON file holding the summaries, read if it exists
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.records = dict()
+        if os.path.exists(filename):
+            with open(filename, "r") as f:
+                self.records = json.load(f)
+        self.modified = False
+
+    def __contains__(self, path):
+        return path in self.records
+
+    def __getitem__(self, path):
+        return self.records[path]
+
+    def stale(self, path):
+        """True if path has no record or its size or mtime changed."""
+        record = self.records.get(path)
+        if record is None:
+            return True
+        stat = os.stat(path)
+        return record["size"] != stat.st_size or record["mtime"] != stat.st_mtime
+
+    def update(self, paths, threads=None):
+        """Summarise the new or changed files of paths, using a pool of threads.
+
+        Returns:
+            list of the paths that were summarised
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        stale = [path for path in paths if self.stale(path)]
+        if stale:
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                for path, record in zip(stale, executor.map(summarise, stale)):
+                    self.records[path] = record
+            self.modified = True
+            logging.info("Summarised {} of {} files".format(len(stale), len(paths)))
+        return stale
+
+    def covering(self, low, high):
+        """Files whose L_S range overlaps the window [low, high].
+
+        The window wraps through 360 if low > high, as do files whose last
+        L_S is smaller than their first. Files without L_S are skipped.
+        """
+        window = _ls_intervals(low, high)
+        return sorted(path for path, record in self.records.items()
+                      if "first_L_S" in record and _overlaps(
+                          window, _ls_intervals(record["first_L_S"], record["last_L_S"])))
+
+    def save(self):
+        if not self.modified:
+            return
+        utils.write_json(self.filename, self.records, indent=2, sort_keys=True)
+        self.modified = False
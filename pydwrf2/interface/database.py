@@ -23,10 +23,13 @@ def csv(s):
 @click.argument("index_filename")
 @click.argument("output_filename")
 @click.option("--aggregation", type=csv, default="mean,std")
-def aggregate(variable, index_filename, output_filename, aggregation):
+@click.option("--processes", type=int, default=1,
+              help="Number of worker processes, 0 for one per core")
+def aggregate(variable, index_filename, output_filename, aggregation, processes):
     """Dumb average of data"""
     from ..database import commands
-    commands.aggregate(variable, index_filename, output_filename, aggregation)
+    commands.aggregate(variable, index_filename, output_filename, aggregation,
+                       processes=processes or None)
 
 
 @cli.command()
@@ -55,6 +58,33 @@ def index_ls(low, high,
     format_string=format_string)    
 
 
+@cli.command()
+@click.argument("width", type=float)
+@click.option("--step", type=float, default=None)
+@click.option("--overlap", type=float, default=0.0)
+@click.option("--start", type=float, default=0.0)
+@click.option("--no_wrap", is_flag=True, default=False)
+@click.option(
+    "--database_filename", type=str, default="output/database/database_index.csv"
+)
+@click.option("--database_ls_prefix", type=str, default="output/database/database-ls")
+@click.option("--partial_sol", is_flag=True, default=False)
+@click.option("--format_string", default="05.1f")
+def index_ls_batch(width, step, overlap, start, no_wrap,
+    database_filename="output/database/database_index.csv",
+    database_ls_prefix="output/database/database-ls",
+    partial_sol=True,
+    format_string="05.1f"):
+    """Create all the L_S specific indices for a window specification."""
+    from ..database import commands
+    commands.index_ls_batch(width, step=step, overlap=overlap, start=start,
+    wrap=not no_wrap,
+    database_filename=database_filename,
+    database_ls_prefix=database_ls_prefix,
+    partial_sol=partial_sol,
+    format_string=format_string)
+
+
 @cli.command()
 @click.argument("filename")
 @click.argument("output_filename")
@@ -71,9 +101,13 @@ def index_one_file(filename, output_filename):
 @click.option(
     "--intermediate", type=str, default="output/intermediate"
 )
+@click.option(
+    "--manifest_filename", type=str, default=None
+)
 def index(index_filename="output/index",
     database_filename="output/database/database_index.csv",
-    intermediate="output/intermediate"):
+    intermediate="output/intermediate",
+    manifest_filename=None):
     """Create a new index file for the database.
 
     Each line includes an index number into each file from the entire wrfout collection
@@ -81,7 +115,31 @@ def index(index_filename="output/index",
     from ..database import commands
     commands.index(index_filename=index_filename,
         database_filename=database_filename,
-        intermediate=intermediate)
+        intermediate=intermediate,
+        manifest_filename=manifest_filename)
+
+
+@cli.command()
+@click.option("--index_filename", type=str, default="output/index")
+@click.option("--summary_filename", type=str, default="output/database/summary.json")
+@click.option("--threads", type=int, default=None)
+def summarise(index_filename, summary_filename, threads):
+    """Summarise the time span, L_S range, variables and grid of each wrfout file."""
+    from ..database import commands
+    commands.summarise(index_filename=index_filename,
+        summary_filename=summary_filename,
+        threads=threads)
+
+
+@cli.command()
+@click.argument("low", type=float)
+@click.argument("high", type=float)
+@click.option("--summary_filename", type=str, default="output/database/summary.json")
+def files_covering(low, high, summary_filename):
+    """Print the wrfout files with data between L_S low and high."""
+    from ..database import commands
+    for filename in commands.files_covering(low, high, summary_filename):
+        print(filename)
 
 if __name__ == "__main__":
     cli()
@@ -1,42 +1,88 @@
 import xarray
 import numpy as np
+from ..core.geometry import GridGeometry, grid_geometry, band_rows
 
 def areasum(data, area=None, south_lim=-90, north_lim=90, mean=False):
+    """Area weighted sum over (south_north, west_east) of a latitude band.
 
-    filtered_data = data.where((data.south_north >= south_lim) & (data.south_north < north_lim))    
-    if area is not None:
-        filtered_area = area.where((area.south_north >= south_lim) & (area.south_north < north_lim))
-    else:
-        filtered_area = 1
-    
-    
-    result = (filtered_data*filtered_area).sum(["south_north", "west_east"], skipna=True)
+    The band is south_lim <= south_north < north_lim and is taken by slicing
+    the rows rather than masking the whole grid.
+
+    Args:
+        data : DataArray with south_north and west_east dimensions
+        area : cell areas, or a GridGeometry whose cached band totals are
+            used to normalise when mean is True. None for unweighted sums.
+        mean : divide by the total area (or number of cells) in the band
+    """
+    rows = band_rows(data.south_north.values, south_lim, north_lim)
+    filtered_data = data.isel(south_north=rows)
+    area, geometry = _weights(area)
+    if area is None:
+        result = filtered_data.sum(["south_north", "west_east"], skipna=True)
+        if mean:
+            result /= filtered_data.sizes["south_north"] * filtered_data.sizes["west_east"]
+        return result
+
+    result = (filtered_data * area.isel(south_north=rows)).sum(["south_north", "west_east"],
+                                                               skipna=True)
     if mean:
-        if isinstance(filtered_area,int):
-            result /= filtered_data.size
-        else:
-            result /= filtered_area.sum(["south_north", "west_east"], skipna=True)
+        result /= _band_area(area, geometry, rows)
     return result
 
+
+def _weights(area):
+    """Cell areas and GridGeometry (or None) of an area argument."""
+    if isinstance(area, GridGeometry):
+        return area.area, area
+    return area, None
+
+
+def _band_area(area, geometry, rows):
+    """Total area of a slice of rows, from the geometry cache if there is one."""
+    if geometry is not None:
+        return geometry.rows_area(rows)
+    return area.isel(south_north=rows).sum(["south_north", "west_east"], skipna=True)
+
 def read_area(nc):
-    if "XLAT_V" in nc:
-        dy = (
-            nc["XLAT_V"][:]
-            .diff("south_north_stag")
-            .rename(dict(south_north_stag="south_north"))
-        )
-    else:
-        dy = nc["XLAT_V"][:].diff("south_north").mean()
-
-    if "XLONG_U" in nc:
-        dx = nc["XLONG_U"][:].diff("west_east_stag").rename(dict(west_east_stag="west_east"))
-    else:
-        dx = nc["XLONG_U"][:].diff("west_east").mean()
-
-    y = nc["XLAT"][:]
-    d2r = np.deg2rad
-    area = nc.RADIUS * nc.RADIUS * d2r(dx) * d2r(dy) * np.cos(d2r(y))
-
-    return area, y
-
-                  
+    """Return the cell areas and latitudes of the grid, without a Time dimension.
+
+    The values come from the per-process grid geometry cache, so files on
+    the same grid only compute them once. Public API for scripts; the
+    diagnostics use grid_geometry directly.
+    """
+    geometry = grid_geometry(nc)
+    return geometry.area, geometry.lat
+
+
+GLOBAL = (-np.inf, np.inf)
+
+
+def integrate(variables, area, bands=None, mean=False):
+    """Area weighted sums of several variables over several latitude bands.
+
+    Each variable is weighted and reduced over west_east once, then every
+    band is a sum over a row range of that zonal total, so the full grid is
+    only traversed once per variable.
+
+    Args:
+        variables : dict of name -> DataArray with south_north and west_east
+        area : cell areas or a GridGeometry
+        bands : dict of band name -> (south_lim, north_lim) in south_north
+            index units, default {"global": GLOBAL}
+        mean : divide by the total area of each band
+    Returns:
+        dict of (variable name, band name) -> DataArray
+    """
+    bands = bands or {"global": GLOBAL}
+    area, geometry = _weights(area)
+
+    result = dict()
+    for name, data in variables.items():
+        zonal = (data * area).sum("west_east", skipna=True)
+        for band, (south_lim, north_lim) in bands.items():
+            rows = band_rows(zonal.south_north.values, south_lim, north_lim)
+            total = zonal.isel(south_north=rows).sum("south_north", skipna=True)
+            if mean:
+                total /= _band_area(area, geometry, rows)
+            result[(name, band)] = total
+    return result
@@ -4,7 +4,8 @@ import os
 import logging
 import xarray
 import numpy as np
-from .common import get_mode, remove_contiguous, add_attributes
+from ..core import utils
+from .common import append_netcdf, remove_contiguous, zonal_mean_surfaces
 
 def eq_tau_od2d(filename, output_filename, width=10):
     """Function to calculate zonal mean equatorial dust opacity.
@@ -23,12 +24,10 @@ def eq_tau_od2d(filename, output_filename, width=10):
 
     with xarray.open_dataset(filename) as input:
         logging.info("Calculating")
-        tau = dust.process_file(filename, width=width)
+        tau = dust.process_file(input, width=width)
         tau = remove_contiguous(tau)
         logging.info("Saving")
-        tau.to_netcdf(
-            output_filename, unlimited_dims=["Time"], mode=get_mode(output_filename)
-        )
+        append_netcdf(tau, output_filename)
 
 def energy_balance(filename, output_filename):
     """Program to calculate energy balance
@@ -42,35 +41,76 @@ def energy_balance(filename, output_filename):
 
     with xarray.open_dataset(filename) as input_data:
         logging.info("Calculating")
-        table = eb.process_file(filename)
+        table = eb.process_file(input_data)
         data = remove_contiguous(xarray.Dataset(table))
         logging.info("Saving")
-        data.to_netcdf(
-            output_filename, unlimited_dims=["Time"], mode=get_mode(output_filename)
-        )
+        append_netcdf(data, output_filename)
 
 
-def zonal_mean_surface(filename, output_filename, variable, attributes=None):
-    from .common import zonal_mean_surface as zms
+def t15(
+    index_filename,
+    output_filename,
+    processes=None,
+    block_size=None,
+    chunk_size=None,
+    max_memory=None,
+):
+    """Calculate the 15 micron brightness temperature for a whole run.
+
+    Args:
+        index_filename : JSON file list written by wrf.common._index
+        output_filename : The output filename
+        processes : number of worker processes, default all cores
+        block_size : split each file into tasks of this many time records
+        chunk_size : maximum number of time records read at once
+        max_memory : maximum working memory per block in bytes
+    Output:
+        t15, L_S and Times for every record of the run, appended to the
+        output file without the Times it already holds
+    """
+    from . import t15 as t15_module
+
+    filenames = utils.collection_files(index_filename)
+    if not filenames:
+        logging.warning("No wrfout files in {}, nothing to write".format(index_filename))
+        return
+    logging.info("Calculating T15 for {} files".format(len(filenames)))
+    data = t15_module.process_collection(
+        filenames,
+        processes=processes,
+        block_size=block_size,
+        chunk_size=chunk_size,
+        max_memory=max_memory,
+    )
+    data = remove_contiguous(data)
+    logging.info("Saving")
+    append_netcdf(data, output_filename)
+
 
+def zonal_mean_surface(filename, output_filename, variable, attributes=None):
     logging.info("zonal mean for {}".format(variable))
     logging.info("output to {}".format(output_filename))
 
     with xarray.open_dataset(filename) as input:
+        zm = remove_contiguous(zonal_mean_surfaces(input, variable, attributes))
+        append_netcdf(zm, output_filename)
+
+
+def diagnostics(filename, output_filenames, options=None):
+    """Calculate several diagnostics from a single read of a wrfout file.
+
+    Args:
+        filename: wrfout file to process
+        output_filenames : dictionary of diagnostic name -> output filename,
+            names from pipeline.BUILTIN_DIAGNOSTICS
+        options : dictionary of diagnostic name -> keyword arguments
+    Output:
+        One output file per diagnostic, as written by the single commands.
+    """
+    from .pipeline import Pipeline
 
-        def force_loop(s):
-            if isinstance(s, str):
-                return [s]
-            else:
-                return s
-
-        data = dict()
-        for v in force_loop(variable):
-            logging.debug("Calculating {}".format(v))
-            data.update(zms(input, v))
-        zm = remove_contiguous(xarray.Dataset(data))
-
-        add_attributes(zm,attributes)
-        zm.to_netcdf(
-            output_filename, unlimited_dims=["Time"], mode=get_mode(output_filename)
-        )
+    options = options or dict()
+    pipe = Pipeline(filename)
+    for name, output_filename in output_filenames.items():
+        pipe.add(name, output_filename, **options.get(name, dict()))
+    pipe.run()
@@ -1,8 +1,11 @@
 import numpy as np
 import xarray
+import netCDF4
 from ..core import variables, utils
 from os.path import exists, dirname, join
 from os import makedirs, path
+import os
+import re
 import logging
 
 def add_attributes(var, attrs):
@@ -25,34 +28,90 @@ def make_directory_for_file(filepath):
     return directory
     
     
-def _index(directory, output_filename):
-    import glob
-    if directory is None:
-        pathjoin = lambda x,y : y
-    else:
-        pathjoin = lambda x, y: join(x,y)
+STREAMS = ["wrfout", "wrfrst", "auxhist5", "auxhist8", "auxhist9"]
+STREAM_PATTERN = re.compile(r"^({})_.*_..:..:..$".format("|".join(STREAMS)))
 
-    def sorted_strip_base(li):
-        return sorted([path.basename(l) for l in li])
-    
-    wrfout = glob.glob(pathjoin(directory, "wrfout_*_??:??:??"))
-    wrfrst = glob.glob(pathjoin(directory, "wrfrst_*_??:??:??"))
-    auxhist5 = glob.glob(pathjoin(directory, "auxhist5_*_??:??:??"))
-    auxhist8 = glob.glob(pathjoin(directory, "auxhist8_*_??:??:??"))
-    auxhist9 = glob.glob(pathjoin(directory, "auxhist9_*_??:??:??"))
-    
-    files = dict(
-        root=directory,
-        wrfout=sorted_strip_base(wrfout),
-        wrfrst=sorted_strip_base(wrfrst),
-        auxhist5=sorted_strip_base(auxhist5),
-        auxhist8=sorted_strip_base(auxhist8),
-        auxhist9=sorted_strip_base(auxhist9),
-    )
+
+def scan_directory(directory=None):
+    """List the output streams of a run directory in a single pass.
+
+    Args:
+        directory : run directory, default the current directory
+    Returns:
+        dict of stream name -> sorted list of (basename, size, mtime)
+    """
+    streams = dict((stream, []) for stream in STREAMS)
+    with os.scandir(directory or ".") as entries:
+        for entry in entries:
+            match = STREAM_PATTERN.match(entry.name)
+            if match is None or not entry.is_file():
+                continue
+            stat = entry.stat()
+            streams[match.group(1)].append((entry.name, stat.st_size, stat.st_mtime))
+    for files in streams.values():
+        files.sort()
+    return streams
+
+
+def decode_scalar(value):
+    """Python value of a single element DataArray, with bytes decoded."""
+    value = value.values[()]
+    if isinstance(value, bytes):
+        return value.decode("utf-8")
+    return value.item() if hasattr(value, "item") else value
+
+
+def sniff(nc):
+    """First and last Times and L_S of an open dataset, read without loading the data."""
+    summary = dict()
+    for name in ["Times", "L_S"]:
+        if name in nc.variables and nc[name].size:
+            summary["first_" + name] = decode_scalar(nc[name][0])
+            summary["last_" + name] = decode_scalar(nc[name][-1])
+    return summary
+
+
+def sniff_file(filename):
+    """First and last Times and L_S of a file, see sniff.
+
+    Files that can't be read (e.g. still being written) give an empty summary.
+    """
+    try:
+        nc = xarray.open_dataset(filename, decode_times=False)
+    except Exception as e:
+        logging.warning("Could not read {}: {}".format(filename, e))
+        return dict()
+    with nc:
+        return sniff(nc)
+
+
+def _index(directory, output_filename, sniff_files=False, threads=None):
+    """Write the JSON list of the output files of a run directory.
+
+    Besides the sorted basenames of each stream, the "metadata" entry holds
+    the stream, size and mtime of every file and, if sniff_files is set, the
+    first and last Times and L_S, read by a pool of threads.
+    """
+    streams = scan_directory(directory)
+    files = dict(root=directory)
+    metadata = dict()
+    for stream, entries in streams.items():
+        files[stream] = [name for name, size, mtime in entries]
+        for name, size, mtime in entries:
+            metadata[name] = dict(stream=stream, size=size, mtime=mtime)
+
+    if sniff_files and metadata:
+        from concurrent.futures import ThreadPoolExecutor
+        names = sorted(metadata)
+        paths = [name if directory is None else join(directory, name) for name in names]
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            for name, summary in zip(names, executor.map(sniff_file, paths)):
+                metadata[name].update(summary)
+    files["metadata"] = metadata
 
     import json
     make_directory_for_file(output_filename)
-    
+
     json.dump(files, open(output_filename, "w"),indent=2)
     return files
 
@@ -119,6 +178,25 @@ def zonal_mean_surface(fname, variable, rows=None):
 #                nc.close()
             return data_dict
 
+
+def force_list(s):
+    """A list of names from a single name or a sequence of names."""
+    if isinstance(s, str):
+        return [s]
+    return list(s)
+
+
+def zonal_mean_surfaces(nc, variable, attributes=None):
+    """Dataset of the zonal means of one or more surface variables."""
+    data = dict()
+    for v in force_list(variable):
+        logging.debug("Calculating {}".format(v))
+        data.update(zonal_mean_surface(nc, v))
+    data = xarray.Dataset(data)
+    add_attributes(data, attributes)
+    return data
+
+
 def remove_contiguous(data, entry="contiguous"):
     """Removes the contiguous entry from the encoding from certain variables.
       Args:
@@ -147,3 +225,118 @@ def get_mode(filename):
         logging.debug("{} does not exist, setting mode to 'w'".format(filename))
         mode = "w"
     return mode
+
+
+TIMES_NAMES = ["Times", "times"]
+
+
+def _string_to_char(values, length):
+    """Fixed width strings (...) as a character array (..., length)."""
+    values = np.ascontiguousarray(values, dtype="S{}".format(length))
+    return values.view("S1").reshape(values.shape + (length,))
+
+
+def _char_to_string(values):
+    """Character array (..., length) as fixed width strings (...)."""
+    values = np.ascontiguousarray(values)
+    return values.view("S{}".format(values.shape[-1]))[..., 0]
+
+
+def _time_strings(values):
+    values = np.asarray(values)
+    if values.dtype.kind == "S" and values.dtype.itemsize == 1 and values.ndim > 1:
+        values = _char_to_string(values)
+    return [v.decode("utf-8") if isinstance(v, bytes) else str(v) for v in values.ravel()]
+
+
+def _new_records(times, present=()):
+    """Positions of the first record of each time that isn't in present."""
+    present = set(_time_strings(present))
+    keep = []
+    for i, t in enumerate(_time_strings(times)):
+        if t not in present:
+            keep.append(i)
+            present.add(t)
+    return keep
+
+
+def _create_variable(nc, name, encoded):
+    """Add an encoded variable to an open netCDF4 file, with its missing dimensions.
+
+    Fixed width strings are stored as characters along a stringN dimension,
+    as xarray writes them.
+    """
+    dims = list(encoded.dims)
+    shape = list(encoded.shape)
+    dtype = encoded.dtype
+    if dtype.kind == "S" and dtype.itemsize > 1:
+        dims.append("string{}".format(dtype.itemsize))
+        shape.append(dtype.itemsize)
+        dtype = np.dtype("S1")
+    for d, size in zip(dims, shape):
+        if d not in nc.dimensions:
+            nc.createDimension(d, size)
+    attrs = dict(encoded.attrs)
+    fill_value = attrs.pop("_FillValue", None)
+    target = nc.createVariable(name, dtype, dims, fill_value=fill_value)
+    target.setncatts(attrs)
+    return target
+
+
+def append_netcdf(data, filename, dim="Time", times=None):
+    """Append the new records of a dataset to a netCDF file along dim.
+
+    Records whose time string (times, default the first of TIMES_NAMES in
+    data) repeats an earlier record, or is already in the file, are dropped.
+    The file is created if it doesn't exist; otherwise only the remaining
+    slab is written to the end of every variable with the dim, which must
+    be unlimited in the file.
+    Variables with the dim that are not in the file yet are added, filled
+    for the earlier records. Variables without the dim are left as they are.
+
+    Returns:
+        number of records written
+    """
+    if times is None:
+        times = next((t for t in TIMES_NAMES if t in data.variables), None)
+
+    if not path.exists(filename):
+        if times is not None:
+            data = data.isel({dim: _new_records(data[times].values)})
+        data.to_netcdf(filename, unlimited_dims=[dim], mode="w")
+        return data.sizes.get(dim, 0)
+
+    utils.POOL.discard(filename)
+    with netCDF4.Dataset(filename, "a") as nc:
+        nc.set_auto_chartostring(False)
+        if dim not in nc.dimensions or not nc.dimensions[dim].isunlimited():
+            raise ValueError("{} has no unlimited {} dimension to append to".format(filename, dim))
+        start = len(nc.dimensions[dim])
+
+        keep = np.arange(data.sizes.get(dim, 0))
+        if times is not None and times in nc.variables:
+            keep = _new_records(data[times].values, nc.variables[times][:start])
+        if len(keep) == 0:
+            logging.debug("No new records for {}".format(filename))
+            return 0
+        data = data.isel({dim: keep})
+
+        for name, variable in data.variables.items():
+            if dim not in variable.dims:
+                continue
+            variable = variable.copy(deep=False)
+            if name in nc.variables:
+                target = nc.variables[name]
+                variable.encoding = dict((k, target.getncattr(k)) for k in ["units", "calendar"]
+                                         if k in target.ncattrs())
+            encoded = xarray.conventions.encode_cf_variable(variable, name=name)
+            if name not in nc.variables:
+                target = _create_variable(nc, name, encoded)
+            values = np.asarray(encoded.values)
+            is_string = values.dtype.kind == "S" and values.dtype.itemsize > 1
+            if is_string and target.dtype.itemsize == 1:
+                values = _string_to_char(values, target.shape[-1])
+            index = [slice(None)] * values.ndim
+            index[variable.dims.index(dim)] = slice(start, start + len(keep))
+            target[tuple(index)] = values
+    return len(keep)
@@ -1,40 +1,81 @@
 import xarray
 import numpy as np
 
-def parse_dates(times):
-    lengths = [4,5,2,2,2]
-    slices = []
-    s=0
-    for l in lengths:
-        slices.append( slice(s,s+l) )
-        s+=l+1
-    return np.array([[int(string[s].decode('utf-8')) for s in slices] for string in times.values.tolist()])
+# Fields of a WRF "YYYY-DDDDD_HH:MM:SS" times string as (start, stop) offsets.
+FIELDS = [("year", 0, 4), ("sol", 5, 10), ("hour", 11, 13), ("minute", 14, 16), ("second", 17, 19)]
+TIMES_LENGTH = 19
+
+
+def times_to_chars(times):
+    """View WRF Times as a (record, character) uint8 matrix without copying
+    when the input is already a fixed width byte array."""
+    values = np.asarray(getattr(times, "values", times))
+    if values.dtype.kind == "S" and values.dtype.itemsize == 1 and values.ndim >= 2:
+        # undecoded netCDF char array (Time, DateStrLen)
+        values = np.ascontiguousarray(values)
+        return values.view(np.uint8).reshape(-1, values.shape[-1])
+    if values.dtype.kind != "S":
+        values = values.astype("S{}".format(TIMES_LENGTH))
+    values = np.ascontiguousarray(values.reshape(-1))
+    return values.view(np.uint8).reshape(values.size, values.dtype.itemsize)
+
+
+def parse_times(times):
+    """Parse WRF Times into a structured array with integer fields
+    year, sol, hour, minute and second.
 
+    The digits are extracted with fixed offset arithmetic on the raw bytes.
+    """
+    chars = times_to_chars(times)
+    if chars.shape[-1] < TIMES_LENGTH:
+        raise ValueError("WRF times strings must have {} characters".format(TIMES_LENGTH))
+    digits = chars[:, :TIMES_LENGTH].astype(np.int64) - ord("0")
+
+    result = np.empty(chars.shape[0], dtype=[(name, np.int64) for name, _, _ in FIELDS])
+    for name, start, stop in FIELDS:
+        field = digits[:, start:stop]
+        if field.size and (field.min() < 0 or field.max() > 9):
+            raise ValueError("Non-digit character in the {} field of WRF times".format(name))
+        result[name] = field @ (10 ** np.arange(stop - start - 1, -1, -1))
+    return result
+
+
+def parse_dates(times):
+    """Parse WRF Times into an integer array of shape (record, 5) with columns
+    year, sol, hour, minute, second."""
+    parsed = parse_times(times)
+    return np.column_stack([parsed[name] for name, _, _ in FIELDS])
 
 
 def get_years(string):
     """given a WRF times string, return the year in integer form"""
-    return parse_dates(string)[:,0]
+    return parse_times(string)["year"]
     
 def get_days(string):
     """given a WRF times string, return the day in integer form"""
-    return parse_dates(string)[:,1]
+    return parse_times(string)["sol"]
 
 def get_hours(string):
     """Get the hours from the WRF date string"""
-    return parse_dates(string)[:,2]
+    return parse_times(string)["hour"]
 
 def get_minutes(string):
     """Get the minutes from the WRF date string"""
-    return parse_date(string)[:,3]
+    return parse_times(string)["minute"]
 
 def get_seconds(string):
     """Get the seconds from the WRF date string"""
-    return parse_date(string)[:,4]
+    return parse_times(string)["second"]
     
 def dates_to_dict(string):
-    """Returns a dictionary of the parsed date"""
-    return dict(zip(["year","hour","minute","second"],parse_dates(string).T))
+    """Returns a dictionary of the parsed date fields: year, sol, hour, minute, second.
+
+    Earlier versions had no sol key and returned the sol, hour and minute
+    under hour, minute and second; callers reading those keys get the
+    correct fields now.
+    """
+    parsed = parse_times(string)
+    return dict((name, parsed[name]) for name in parsed.dtype.names)
 
 
 
@@ -6,36 +6,36 @@ from ..datasets import load_data
 import pandas as pd
 import logging
 from . import area_integrals
+from ..core import utils
 
 def process_file(fname, variable="TAU_OD2D", width=10, rescale=1.0):
     """Calculate the column optical depth over the equator."""
 
-    nc = xarray.open_dataset(fname)
-    dust = nc[variable]
-    psfc = nc["PSFC"]
-    area, y = area_integrals.read_area(nc)
-    
-    ls = nc["L_S"][:]
-    times = nc["Times"][:]
-    lats = nc["XLAT"].isel(Time=0,west_east=0)
-    south_lim = np.where(lats<=-width)[0].max()
-    north_lim = np.where(lats>+width)[0].min()
-    print(south_lim, north_lim)
-    
-    tau_od2d = area_integrals.areasum(dust, area, south_lim=south_lim, north_lim=north_lim, mean=True)
+    with utils.open_dataset(fname) as nc:
+        dust = nc[variable]
+        psfc = nc["PSFC"]
+        geometry = area_integrals.grid_geometry(nc)
+
+        ls = nc["L_S"][:]
+        times = nc["Times"][:]
+        lats = nc["XLAT"].isel(Time=0,west_east=0)
+        south_lim = np.where(lats<=-width)[0].max()
+        north_lim = np.where(lats>+width)[0].min()
+        print(south_lim, north_lim)
+
+        tau_od2d = area_integrals.areasum(dust, geometry, south_lim=south_lim, north_lim=north_lim, mean=True)
 
-    dust_scaled = area_integrals.areasum(610*dust/psfc, area, south_lim=south_lim, north_lim=north_lim,mean=True)
-    dust_scaled /= rescale
+        dust_scaled = area_integrals.areasum(610*dust/psfc, geometry, south_lim=south_lim, north_lim=north_lim,mean=True)
+        dust_scaled /= rescale
 
-    data =  dict(
-        Times=times.load(),
-        L_S=ls.load(),
-        TAU_OD2D=tau_od2d.load(),
-        taudust_scaled=dust_scaled.load()
-    )
+        data =  dict(
+            Times=times.load(),
+            L_S=ls.load(),
+            TAU_OD2D=tau_od2d.load(),
+            taudust_scaled=dust_scaled.load()
+        )
 
-    nc.close()
-    return xarray.Dataset(data)
+        return xarray.Dataset(data)
 
 def plot_dust_scaled(dust_filenames, output_filename, labels="", observation=True):
 
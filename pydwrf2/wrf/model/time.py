@@ -1,5 +1,42 @@
+import functools
+import hashlib
+import os
 import numpy as np
 
+SMALL_VALUE = 1e-6
+MAX_ITERATIONS = 100
+
+
+def eccentric_anomaly(mean_anomaly, eccentricity, small_value=SMALL_VALUE):
+    """Solve Kepler's equation for the eccentric anomaly by Newton iteration.
+
+    Works element-wise on arrays: each element stops updating once its
+    own step is below small_value, exactly as the scalar iteration does.
+    """
+    em = np.asarray(mean_anomaly, dtype=float)
+    e = np.ones_like(em)
+    active = np.ones(em.shape, dtype=bool)
+    for _ in range(MAX_ITERATIONS):
+        ep = e - (e - eccentricity * np.sin(e) - em) / (1 - eccentricity * np.cos(e))
+        cd0 = np.abs(e - ep)
+        e = np.where(active, ep, e)
+        active &= cd0 > small_value
+        if not active.any():
+            break
+    return e
+
+
+@functools.lru_cache(maxsize=32)
+def equinox_anomaly(eccentricity, equinox_fraction, planet_year):
+    """True anomaly at the vernal equinox, cached per orbital parameter set."""
+    deleqn = equinox_fraction * planet_year
+    er = np.sqrt((1 + eccentricity) / (1 - eccentricity))
+
+    #  qq is the mean anomaly
+    qq = 2.0 * (np.pi * deleqn / planet_year)
+    e = eccentric_anomaly(qq, eccentricity)
+    return float(2 * np.arctan(er * np.tan(0.5 * e)))
+
 
 def get_ls(
     julian,
@@ -8,6 +45,7 @@ def get_ls(
     equinox_fraction=0.2695,
     zero_date=488.7045,
     planet_year=669,
+    lookup=False,
 ):
     """----------------------------------------------------------------
     !
@@ -17,60 +55,40 @@ def get_ls(
     ! midnight at the beginning of the first day of the year is
     ! equal to a "Julian day" of 0.0....
     !
-    ! Input: Julian day (sols, fractional)
+    ! Input: Julian day (sols, fractional), scalar or array
     !
-    ! Output: Solar longitude (degrees)
+    ! Output: Solar longitude (degrees), same shape as the input
+    !
+    ! With lookup=True the value is interpolated from a cached LsTable
+    ! instead of solving Kepler's equation.
     !
     !----------------------------------------------------------------
     """
-    small_value = 1e-6
-
-    deleqn = equinox_fraction * planet_year
+    if lookup:
+        return ls_table(
+            obliquity, eccentricity, equinox_fraction, zero_date, planet_year
+        ).get_ls(julian)
 
     # -----CALCULATE LONGITUDE OF THE SUN FROM VERNAL EQUINOX:
 
     #  DATE = DAYS SINCE LAST PERIHELION PASSAGE
-    date = julian - zero_date
-    while date < 0:
-        date += planet_year
-    while date > planet_year:
-        date -= planet_year
+    date = np.mod(np.asarray(julian, dtype=float) - zero_date, planet_year)
 
     # er = SQRT( (1.d0+eccentricity_used)/(1.d0-eccentricity_used) )
     er = np.sqrt((1 + eccentricity) / (1 - eccentricity))
 
-    #  qq is the mean anomaly
-    # qq = 2.d0 * (pi * deleqn / REAL(PLANET_YEAR))
-    qq = 2 * (np.pi * deleqn / planet_year)
-
     #  determine true anomaly at equinox:  eq
-    #  Iteration for eq
-    e = 1.0
-    cd0 = 1.0
-
-    while cd0 > small_value:
-        ep = e - (e - eccentricity * np.sin(e) - qq) / (1 - eccentricity * np.cos(e))
-        cd0 = np.abs(e - ep)
-        e = ep
-    eq = 2 * np.arctan(er * np.tan(0.5 * e))
+    eq = equinox_anomaly(eccentricity, equinox_fraction, planet_year)
 
     #  determine true anomaly at current date:  w
-    #  Iteration for w
     em = 2.0 * np.pi * date / planet_year
-    e = 1.0
-    cd0 = 1.0
-    while cd0 > small_value:
-        ep = e - (e - eccentricity * np.sin(e) - em) / (1 - eccentricity * np.cos(e))
-        cd0 = np.abs(e - ep)
-        e = ep
+    e = eccentric_anomaly(em, eccentricity)
     w = 2.0 * np.arctan(er * np.tan(0.5 * e))
 
     #  Radius vector ( astronomical units:  AU )
     als = (w - eq) * 180.0 / np.pi  # Solar Longitude
-    if als < 0:
-        als = als + 360
-    ls = als
-    return ls
+    ls = np.where(als < 0, als + 360, als)
+    return ls[()]
 
 
 def get_julian(
@@ -80,6 +98,7 @@ def get_julian(
     equinox_fraction=0.2695,
     zero_date=488.7045,
     planet_year=669,
+    lookup=False,
 ):
     """-------------------------------------------------
     REAL FUNCTION get_julian(ls) RESULT (julian)
@@ -91,32 +110,25 @@ def get_julian(
     ! midnight at the beginning of the first day of the year is
     ! equal to a "Julian day" of 0.0....
     !
-    ! Input: Solar longitude (degrees)
+    ! Input: Solar longitude (degrees), scalar or array
+    !
+    ! Output: Julian day (sols, fractional), same shape as the input
     !
-    ! Output: Julian day (sols, fractional)
+    ! With lookup=True the value is interpolated from a cached LsTable.
     !
     !----------------------------------------------------------------
     """
-    small_value = 1e-6
-
-    deleqn = equinox_fraction * planet_year
+    if lookup:
+        return ls_table(
+            obliquity, eccentricity, equinox_fraction, zero_date, planet_year
+        ).get_julian(ls)
 
     er = np.sqrt((1 + eccentricity) / (1 - eccentricity))
 
-    #  qq is the mean anomaly
-    qq = 2.0 * (np.pi * deleqn / planet_year)
-
     #  determine true anomaly at equinox:  eq
-    #  Iteration for eq
-    e = 1
-    cd0 = 1
-    while cd0 > small_value:
-        ep = e - (e - eccentricity * np.sin(e) - qq) / (1 - eccentricity * np.cos(e))
-        cd0 = np.abs(e - ep)
-        e = ep
-    eq = 2 * np.arctan(er * np.tan(0.5 * e))
+    eq = equinox_anomaly(eccentricity, equinox_fraction, planet_year)
 
-    w = eq + ls * np.pi / 180.0
+    w = eq + np.asarray(ls, dtype=float) * np.pi / 180.0
 
     # e is the eccentric anomaly
     e = 2.0 * np.arctan((np.tan(w * 0.5)) / er)
@@ -127,9 +139,147 @@ def get_julian(
 
     ajulian = dp_date + zero_date
 
-    if ajulian < 0:
-        ajulian = ajulian + planet_year
-    if ajulian > planet_year:
-        ajulian = ajulian - planet_year
+    ajulian = np.where(ajulian < 0, ajulian + planet_year, ajulian)
+    ajulian = np.where(ajulian > planet_year, ajulian - planet_year, ajulian)
+
+    return ajulian[()]
+
+
+class LsTable(object):
+    """Tabulated solar longitude over one planet year for fast conversions.
+
+    L_S is stored unwrapped (continuous) against Julian day so that both
+    directions are a single linear interpolation.
+
+    Attributes:
+        julian : table Julian days, 0 to planet_year
+        ls : continuous solar longitude at julian (degrees)
+        planet_year : length of the year (sols)
+        ls_error : maximum error of get_ls against the iterative solution (degrees)
+        julian_error : maximum error of get_julian against the exact inverse (sols)
+    """
+
+    def __init__(self, julian, ls, planet_year, ls_error=np.nan, julian_error=np.nan):
+        self.julian = julian
+        self.ls = ls
+        self.planet_year = planet_year
+        self.ls_error = ls_error
+        self.julian_error = julian_error
+
+    def get_ls(self, julian):
+        # the Julian day grid is uniform, so the interval is found directly
+        # non-finite days are looked up as 0 and masked back to NaN
+        julian = np.asarray(julian, dtype=float)
+        finite = np.isfinite(julian)
+        step = self.julian[1] - self.julian[0]
+        position = np.mod(np.where(finite, julian, 0.0), self.planet_year) / step
+        index = np.minimum(position.astype(np.intp), self.julian.size - 2)
+        fraction = position - index
+        ls = self.ls[index] + fraction * (self.ls[index + 1] - self.ls[index])
+        return np.where(finite, np.mod(ls, 360.0), np.nan)[()]
+
+    def get_julian(self, ls):
+        ls0 = self.ls[0]
+        target = ls0 + np.mod(np.asarray(ls, dtype=float) - ls0, 360.0)
+        julian = np.interp(target, self.ls, self.julian)
+        return julian[()]
+
+    def save(self, filename):
+        np.savez(
+            filename,
+            julian=self.julian,
+            ls=self.ls,
+            planet_year=self.planet_year,
+            ls_error=self.ls_error,
+            julian_error=self.julian_error,
+        )
+
+    @classmethod
+    def load(cls, filename):
+        with np.load(filename) as data:
+            return cls(
+                data["julian"],
+                data["ls"],
+                float(data["planet_year"]),
+                float(data["ls_error"]),
+                float(data["julian_error"]),
+            )
+
+
+def _periodic_difference(a, b, period):
+    """Smallest absolute difference between a and b modulo period."""
+    d = np.mod(a - b, period)
+    return np.minimum(d, period - d)
+
+
+def build_ls_table(parameters, tolerance=1e-5, size=1024, max_size=2 ** 22):
+    """Build an LsTable whose interpolation error is below tolerance.
+
+    The table is refined by doubling until the error measured at the
+    quarter, mid and three quarter points of every interval is below
+    tolerance, in degrees for L_S and in sols for the Julian day.
+    """
+    (obliquity, eccentricity, equinox_fraction, zero_date, planet_year) = parameters
+    kwargs = dict(
+        obliquity=obliquity,
+        eccentricity=eccentricity,
+        equinox_fraction=equinox_fraction,
+        zero_date=zero_date,
+        planet_year=planet_year,
+    )
+    fractions = np.array([0.25, 0.5, 0.75])
+    while True:
+        julian = np.linspace(0, planet_year, size + 1)
+        ls = np.rad2deg(np.unwrap(np.deg2rad(get_ls(julian, **kwargs))))
+        table = LsTable(julian, ls, planet_year)
+
+        test_julian = (julian[:-1, None] + np.diff(julian)[:, None] * fractions).ravel()
+        table.ls_error = float(
+            _periodic_difference(
+                table.get_ls(test_julian), get_ls(test_julian, **kwargs), 360.0
+            ).max()
+        )
+        test_ls = np.mod((ls[:-1, None] + np.diff(ls)[:, None] * fractions).ravel(), 360.0)
+        table.julian_error = float(
+            _periodic_difference(
+                table.get_julian(test_ls), get_julian(test_ls, **kwargs), planet_year
+            ).max()
+        )
+        if max(table.ls_error, table.julian_error) < tolerance or size >= max_size:
+            return table
+        size *= 2
+
+
+def ls_table_filename(parameters, tolerance, cache_dir):
+    key = hashlib.sha1(repr((parameters, tolerance)).encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, "ls_table_{}.npz".format(key[:16]))
+
+
+@functools.lru_cache(maxsize=8)
+def ls_table(
+    obliquity=25.19,
+    eccentricity=0.09341233,
+    equinox_fraction=0.2695,
+    zero_date=488.7045,
+    planet_year=669,
+    tolerance=1e-5,
+    cache_dir=None,
+):
+    """Return the LsTable for an orbital parameter set, memoized in-process.
+
+    If cache_dir is given the table is also stored there and reused by
+    later processes.
+    """
+    parameters = (obliquity, eccentricity, equinox_fraction, zero_date, planet_year)
+    filename = None
+    if cache_dir is not None:
+        filename = ls_table_filename(parameters, tolerance, cache_dir)
+        if os.path.exists(filename):
+            return LsTable.load(filename)
+
+    table = build_ls_table(parameters, tolerance)
 
-    return ajulian
+    if filename is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        table.save(filename)
+    return table
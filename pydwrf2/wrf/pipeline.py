@@ -0,0 +1,143 @@
+"""Compute several diagnostics from a single read of a wrfout file.
+
+Diagnostics register the variables they need; the file is opened once,
+the surface fields they share are decoded once, and every diagnostic is
+computed from the same dataset and written to its own output file.
+"""
+import importlib
+import logging
+from collections import namedtuple
+import xarray
+from .common import append_netcdf, remove_contiguous, force_list
+
+Diagnostic = namedtuple(
+    "Diagnostic", ["name", "function", "output_filename", "variables", "kwargs"]
+)
+
+# Needed by every diagnostic (time axis and grid geometry).
+COMMON_VARIABLES = ["Times", "L_S", "XLAT", "XLONG", "XLAT_V", "XLONG_U"]
+
+
+def _eq_tau_od2d(variable="TAU_OD2D", **kwargs):
+    return [variable, "PSFC"]
+
+
+def _energy_balance(**kwargs):
+    return ["TOASW", "TOALW", "RNET_2D", "HFX", "GSW", "GLW", "EMISS", "TSK",
+            "SWDOWN", "CO2ICE"]
+
+
+def _icemass(icevariable="CO2ICE", **kwargs):
+    return [icevariable, "MU", "MUB"]
+
+
+def _tsk(variable="TSK", **kwargs):
+    return [variable]
+
+
+def _t15(**kwargs):
+    return ["P", "PB", "T"]
+
+
+def _zonal_mean_surface_variables(variable, **kwargs):
+    return force_list(variable)
+
+
+# Diagnostic name -> (module, process function, required variables function).
+# Modules are imported when a diagnostic is added, so that using one
+# diagnostic does not need the dependencies of all the others.
+BUILTIN_DIAGNOSTICS = dict(
+    eq_tau_od2d=("dust", "process_file", _eq_tau_od2d),
+    energy_balance=("energy_balance", "process_file", _energy_balance),
+    icemass=("icemass", "process_file", _icemass),
+    tsk=("tsk", "process_file", _tsk),
+    t15=("t15", "process_file", _t15),
+    zonal_mean_surface=("common", "zonal_mean_surfaces", _zonal_mean_surface_variables),
+)
+
+
+def builtin_diagnostic(name):
+    """Process function and required variables function of a builtin diagnostic."""
+    module, function, variables = BUILTIN_DIAGNOSTICS[name]
+    module = importlib.import_module("." + module, __package__)
+    return getattr(module, function), variables
+
+
+class Pipeline(object):
+    """A set of diagnostics computed from one read of a wrfout file.
+
+    Example:
+        pipe = Pipeline("wrfout_d01_...")
+        pipe.add("tsk", "output/tsk.nc")
+        pipe.add("zonal_mean_surface", "output/psfc.nc", variable="PSFC")
+        pipe.run()
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.diagnostics = []
+
+    def register(self, name, function, output_filename, variables, **kwargs):
+        """Register a diagnostic.
+
+        Args:
+            name : label for the diagnostic
+            function : called as function(dataset, **kwargs), returns a
+                dictionary or Dataset of results along Time
+            output_filename : netCDF file the results are written to
+            variables : variables the function reads from the file
+        """
+        self.diagnostics.append(
+            Diagnostic(name, function, output_filename, force_list(variables), kwargs)
+        )
+        return self
+
+    def add(self, name, output_filename, **kwargs):
+        """Register one of the builtin diagnostics by name."""
+        function, variables = builtin_diagnostic(name)
+        return self.register(name, function, output_filename, variables(**kwargs), **kwargs)
+
+    @property
+    def variables(self):
+        needed = list(COMMON_VARIABLES)
+        for diagnostic in self.diagnostics:
+            needed.extend(v for v in diagnostic.variables if v not in needed)
+        return needed
+
+    def read(self, nc):
+        """Select and decode the registered variables from an open file.
+
+        Surface and static fields are loaded into memory once. Fields with a
+        vertical dimension stay lazy so that diagnostics such as t15 can
+        still read them in blocks of time records.
+        """
+        present = [v for v in self.variables if v in nc.variables]
+        missing = set(self.variables) - set(present) - set(COMMON_VARIABLES)
+        if missing:
+            logging.warning("Variables not found in {}: {}".format(
+                self.filename, ",".join(sorted(missing))))
+        data = nc[present]
+        for v in present:
+            if "bottom_top" not in data[v].dims and "bottom_top_stag" not in data[v].dims:
+                data.variables[v].load()
+        return data
+
+    def run(self):
+        """Compute and write every registered diagnostic.
+
+        Returns:
+            dictionary of diagnostic name -> Dataset written
+        """
+        results = dict()
+        with xarray.open_dataset(self.filename) as nc:
+            data = self.read(nc)
+            for diagnostic in self.diagnostics:
+                logging.info("Calculating {}".format(diagnostic.name))
+                result = diagnostic.function(data, **diagnostic.kwargs)
+                if not isinstance(result, xarray.Dataset):
+                    result = xarray.Dataset(result)
+                result = remove_contiguous(result)
+                logging.info("Saving {}".format(diagnostic.output_filename))
+                append_netcdf(result, diagnostic.output_filename)
+                results[diagnostic.name] = result
+        return results
@@ -1,6 +1,8 @@
 import xarray
 import numpy as np
 from ..datasets import load_data
+from ..core import utils, derived
+from ..core.geometry import grid_geometry
 import pandas as pd
 import logging
 
@@ -203,36 +205,62 @@ except Exception:
         return out
 
 
-def t15_core_fast(press, temp, area):
+def interp_columns(p, t, pw):
+    """Linearly interpolate every column of t(p) onto the pressure grid pw.
+
+    Args:
+        p : pressure, shape (..., nz), increasing along the last axis
+        t : temperature, same shape as p
+        pw : target pressure grid, increasing
+    Returns:
+        temperature on pw, shape (..., pw.size). Values outside the column
+        are clamped to the end values, as in the interp1d version.
+    """
+    nz = p.shape[-1]
+    # Equivalent to np.searchsorted(p, pw) for every column at once,
+    # accumulated one level at a time to avoid a (..., pw, nz) temporary.
+    index = np.zeros(p.shape[:-1] + pw.shape, dtype=np.intp)
+    for k in range(nz):
+        index += p[..., k, None] < pw
+    lower = np.clip(index - 1, 0, nz - 2)
+    upper = lower + 1
+
+    p_lower = np.take_along_axis(p, lower, axis=-1)
+    p_upper = np.take_along_axis(p, upper, axis=-1)
+    t_lower = np.take_along_axis(t, lower, axis=-1)
+    t_upper = np.take_along_axis(t, upper, axis=-1)
+
+    weight = np.clip((pw - p_lower) / (p_upper - p_lower), 0.0, 1.0)
+    return t_lower + weight * (t_upper - t_lower)
+
+
+def t15_core_vectorized(press, temp, area):
     """Calculate area weighted mean brightness temperature at 15 microns
-        First interpolate temperature profile to pressure values, then use
-        weighting function to calculate brightness temperature.
+        for a block of time steps at once.
+
+    Args:
+        press : pressure (Pa), shape (..., bottom_top, south_north, west_east)
+        temp : temperature (K), same shape as press
+        area : cell area, shape (south_north, west_east)
+    Returns:
+        area weighted brightness temperature, shape (...)
     """
-    # area weighted mean temperature
-    #    mean_temp = np.average(
-    #        np.average((temp * area[None, :, :]), axis=1), axis=0
-    #    ) / np.average(area)
     y = 0
-    tb15av = 0.0
-    arav = 0.0
-    f = None
-    tw = np.zeros(pw.shape)
-    arav = 1
-    temp = temp[::-1]
-    press = 0.01 * press[::-1]
-    tw = np.zeros((temp.shape[1], temp.shape[2], pw.shape[0]))
+    press = np.asarray(press)
+    temp = np.asarray(temp)
+    area = np.asarray(area)
 
-    for i in np.arange(temp.shape[1]):
-        for j in np.arange(temp.shape[2]):
-            t, p = temp[::-1, i, j], press[::-1, i, j] * 0.01  # reversed
-            tw[i, j] = interp(press[:, i, j], temp[:, i, j], pw)
+    # columns last, surface last (increasing pressure), hPa
+    p = 0.01 * np.moveaxis(press[..., ::-1, :, :], -3, -1)
+    t = np.moveaxis(temp[..., ::-1, :, :], -3, -1)
+    tw = interp_columns(p, t, pw)
 
     rad = -0.0181075 - 39.4312 / (
         tw - 2353.76 - 62644.0 / (tw + 64.445 + 84263.9 / (tw - 185.333))
     )
 
-    radsum = (rad * wtfcn[:, y]).sum(axis=-1)
-    sumwt = sum(wtfcn[:, y])
+    radsum = rad @ wtfcn[:, y]
+    sumwt = wtfcn[:, y].sum()
     xx = radsum / sumwt
 
     tb15 = 881.042 - 2.40183 / (
@@ -241,9 +269,16 @@ def t15_core_fast(press, temp, area):
         - 0.61044e-7 / (xx + 0.162965e-3 - 0.113959e-8 / (xx + 0.228812e-4))
     )
 
-    tb15av = (tb15 * area).sum() / area.sum()
+    tb15av = (tb15 * area).sum(axis=(-2, -1)) / area.sum()
     return tb15av
-    # return 0
+
+
+def t15_core_fast(press, temp, area):
+    """Calculate area weighted mean brightness temperature at 15 microns
+        First interpolate temperature profile to pressure values, then use
+        weighting function to calculate brightness temperature.
+    """
+    return t15_core_vectorized(press, temp, area)[()]
 
 
 def t15_core_slow(press, temp, area):
@@ -283,60 +318,151 @@ def t15_core_slow(press, temp, area):
     return tb15av / arav
 
 
-def process_file(filename, rows=None):
+def record_bytes(nz, ny, nx, itemsize=8):
+    """Estimate the peak working memory needed to process one time record.
+
+    Counts the 3-D input fields and derived pressure/temperature, plus the
+    temporaries of the column interpolation onto pw.
+    """
+    column = nz * ny * nx * itemsize
+    interpolated = ny * nx * pw.size * itemsize
+    return 8 * column + 10 * interpolated
+
+
+def time_blocks(rows, chunk_size=None, max_memory=None, nbytes=None):
+    """Split the requested rows into blocks of time records.
+
+    Args:
+        rows : integer array of time indices
+        chunk_size : maximum number of records per block
+        max_memory : maximum working memory per block in bytes
+        nbytes : memory needed per record, see record_bytes
+    Returns:
+        list of integer arrays
+    """
+    size = len(rows)
+    if chunk_size is not None:
+        size = min(size, int(chunk_size))
+    if max_memory is not None and nbytes:
+        size = min(size, int(max_memory // nbytes))
+    size = max(size, 1)
+    return [rows[i : i + size] for i in range(0, len(rows), size)]
+
+
+def iter_process_file(filename, rows=None, chunk_size=None, max_memory=None):
+    """Process a file in blocks of time records.
+
+    Only the P, PB and T records of the current block are read from disk,
+    so the peak memory is bounded by chunk_size or max_memory (bytes)
+    rather than by the number of records in the file.
+
+    Yields:
+        dictionary of L_S, t15 and Times for each block
+    """
+    with utils.open_dataset(filename) as nc:
+        geometry = grid_geometry(nc)
+        T = nc["T"]
+        latsel = geometry.latitude_rows(-40.0, 40.0)
+        latsel = slice(latsel[0], latsel[-1], 1)
+        band_area = np.asarray(geometry.zonal_area[latsel])
+        fields = derived.Derived(nc[["P", "PB", "T"]])
+
+        rows = rows or slice(None)
+        rows = np.arange(T.shape[0])[rows].astype(int)
+        nbytes = record_bytes(T.shape[1], *band_area.shape)
+
+        for block in time_blocks(rows, chunk_size, max_memory, nbytes):
+            # PRES is computed once and shared with TEMP within the block
+            chunk = fields.isel(Time=block, south_north=latsel)
+            press = chunk["PRES"].values
+            temp = chunk["TEMP"].values
+            tvals = t15_core_vectorized(press, temp, band_area)
+            t15 = xarray.DataArray(
+                tvals,
+                dims=["Time"],
+                attrs=dict(
+                    description="15 micron temperature calculated based on Basu(2002)"
+                ),
+            )
+            yield dict(
+                L_S=nc["L_S"][block].load(),
+                t15=t15,
+                Times=nc["Times"][block].load(),
+            )
+
+
+def process_file(filename, rows=None, chunk_size=None, max_memory=None):
     """Process a file.
 
     Extract variables from the netCDF file, calculate
     the temperature from potential temperature.
     Then pass T,P into the t15_core function to calculate T15 values.
+
+    Args:
+        filename : wrfout file or open dataset
+        rows : time indices to process, default all
+        chunk_size : maximum number of time records read at once
+        max_memory : maximum working memory per block in bytes
+    """
+    blocks = list(iter_process_file(filename, rows, chunk_size, max_memory))
+    data = dict(
+        (k, xarray.concat([b[k] for b in blocks], dim="Time"))
+        for k in ["L_S", "t15", "Times"]
+    )
+    return data
+
+
+def _process_task(task):
+    """Worker entry point for process_collection."""
+    filename, rows, chunk_size, max_memory = task
+    return process_file(filename, rows, chunk_size, max_memory)
+
+
+def _count_records(filename):
+    """Number of time records in a file."""
+    with utils.open_dataset(filename) as nc:
+        return nc.sizes["Time"]
+
+
+def process_collection(
+    filenames, processes=None, block_size=None, chunk_size=None, max_memory=None
+):
+    """Calculate T15 for a collection of files using a pool of processes.
+
+    Args:
+        filenames : list of wrfout files in chronological order
+        processes : number of worker processes, default os.cpu_count()
+        block_size : if set, split each file into tasks of this many records
+        chunk_size, max_memory : passed to process_file for each task
+    Returns:
+        xarray.Dataset of t15, L_S and Times in chronological order, empty if
+        there are no files
     """
-    nc = xarray.open_dataset(filename)
-    xlat = nc["XLAT"][0, :, :]
-    xlong = nc["XLONG"][0, :, :]
-    xlong_u = nc["XLONG_U"][0, :, :]
-    xlat_v = nc["XLAT_V"][0, :, :]
-    dlat = np.diff(xlat_v, axis=0)
-    dlong = np.diff(xlong_u, axis=1)
-
-    radius = nc.RADIUS
-    area = (
-        radius
-        * radius
-        * (1.0 / xlat.shape[-1])
-        * 2
-        * np.pi
-        * (np.sin(np.deg2rad(xlat_v[1:])) - np.sin(np.deg2rad(xlat_v[:-1])))
+    from concurrent.futures import ProcessPoolExecutor
+
+    if len(filenames) == 0:
+        return xarray.Dataset()
+
+    executor = None if processes == 1 else ProcessPoolExecutor(processes)
+    # map returns results in task order, which is chronological
+    mapper = map if executor is None else executor.map
+    try:
+        if block_size is None:
+            tasks = [(f, None, chunk_size, max_memory) for f in filenames]
+        else:
+            counts = list(mapper(_count_records, filenames))
+            tasks = [
+                (f, slice(start, start + block_size), chunk_size, max_memory)
+                for f, n in zip(filenames, counts)
+                for start in range(0, n, block_size)
+            ]
+        results = list(mapper(_process_task, tasks))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    data = dict(
+        (k, xarray.concat([r[k] for r in results], dim="Time"))
+        for k in ["L_S", "t15", "Times"]
     )
-    g = nc.G
-    omega = nc.EOMEG
-    cp = nc.CP
-    rd = nc.R_D
-    kappa = rd / cp
-    t0 = nc.T0
-    p0 = nc.P0
-
-    lat = xlat[:, 0]
-
-    l_s, P, PB, T = [nc.variables[x] for x in ["L_S", "P", "PB", "T"]]
-    latsel = np.where((xlat[:, 0] >= -40.0) & (xlat[:, 0] < 40))[0]
-    latsel = slice(latsel[0], latsel[-1], 1)
-
-    tvals = []
-    rows = rows or slice(None)
-    rows = np.arange(T.shape[0])[rows].astype(int)
-    from tqdm import tqdm
-
-    for i in rows:
-        press = P[i, :, latsel] + PB[i, :, latsel]
-        theta = T[i, :, latsel] + t0
-        temp = (press / p0) ** kappa * theta
-        t15_values = t15_core_fast(press, temp, area[latsel])
-        tvals.append(t15_values)
-    t15=xarray.DataArray(np.array(tvals),dims=["Time"],
-                         attrs = dict(description="15 micron temperature calculated based on Basu(2002)"))
-    data = dict(L_S=l_s[rows], 
-                t15=t15)
-
-    data["Times"] = nc["Times"]
-    
-    return data
\ No newline at end of file
+    return xarray.Dataset(data)
@@ -6,28 +6,28 @@ from ..datasets import load_data
 import pandas as pd
 import logging
 from . import area_integrals
+from ..core import utils
 
 def process_file(fname, variable="TSK", width=10):
     """Calculate the surface temperature over the equator."""
 
-    nc = xarray.open_dataset(fname)
-    tsk_raw = nc[variable]
-    area, y = area_integrals.read_area(nc)
-    
-    ls = nc["L_S"][:]
-    times = nc["Times"][:]
+    with utils.open_dataset(fname) as nc:
+        tsk_raw = nc[variable]
+        geometry = area_integrals.grid_geometry(nc)
 
-    lats = nc["XLAT"].isel(Time=0,west_east=0)
-    south_lim = np.where(lats<=-width)[0].max()
-    north_lim = np.where(lats>=+width)[0].min()
-    
-    tsk = area_integrals.areasum(tsk_raw, area, south_lim=south_lim, north_lim=north_lim, mean=True)
+        ls = nc["L_S"][:]
+        times = nc["Times"][:]
 
-    data =  dict(
-        Times=times.load(),
-        L_S=ls.load(),
-        TSK=tsk.load(),
-    )
+        lats = nc["XLAT"].isel(Time=0,west_east=0)
+        south_lim = np.where(lats<=-width)[0].max()
+        north_lim = np.where(lats>=+width)[0].min()
 
-    nc.close()
-    return xarray.Dataset(data)
+        tsk = area_integrals.areasum(tsk_raw, geometry, south_lim=south_lim, north_lim=north_lim, mean=True)
+
+        data =  dict(
+            Times=times.load(),
+            L_S=ls.load(),
+            TSK=tsk.load(),
+        )
+
+        return xarray.Dataset(data)
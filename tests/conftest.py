@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+import xarray
+
+
+def make_grid(ny=18, nx=36, ntime=2, radius=3389920.0):
+    lat_v = np.linspace(-90, 90, ny + 1)
+    lon_u = np.linspace(-180, 180, nx + 1)
+    lat = 0.5 * (lat_v[1:] + lat_v[:-1])
+    lon = 0.5 * (lon_u[1:] + lon_u[:-1])
+
+    def tile(a):
+        return np.broadcast_to(a, (ntime,) + a.shape)
+
+    nc = xarray.Dataset(
+        dict(
+            XLAT=(("Time", "south_north", "west_east"), tile(np.repeat(lat[:, None], nx, 1))),
+            XLONG=(("Time", "south_north", "west_east"), tile(np.repeat(lon[None, :], ny, 0))),
+            XLAT_V=(("Time", "south_north_stag", "west_east"), tile(np.repeat(lat_v[:, None], nx, 1))),
+            XLONG_U=(("Time", "south_north", "west_east_stag"), tile(np.repeat(lon_u[None, :], ny, 0))),
+        )
+    )
+    nc.attrs["RADIUS"] = radius
+    return nc
+
+
+@pytest.fixture
+def grid():
+    """Factory for a global lat-lon grid with the WRF static coordinates."""
+    return make_grid
+
+
+def make_wrfout(filename, ntime=4, nz=6, ny=18, nx=24, start_sol=0, hours_step=6, seed=0):
+    """Write a small wrfout file with the fields the diagnostics read."""
+    rng = np.random.RandomState(seed)
+    nc = make_grid(ny=ny, nx=nx, ntime=ntime)
+    hours = start_sol * 24 + hours_step * np.arange(ntime)
+    times = ["0001-{:05d}_{:02d}:00:00".format(1 + h // 24, h % 24) for h in hours]
+    nc["Times"] = ("Time", np.array(times, dtype="S19"))
+    nc["L_S"] = ("Time", hours / 48.0)
+
+    surface = ("Time", "south_north", "west_east")
+    column = ("Time", "bottom_top", "south_north", "west_east")
+    psfc = rng.uniform(400, 800, (ntime, ny, nx))
+    pressure = psfc[:, None] * np.exp(-np.linspace(0, 7, nz))[None, :, None, None]
+    nc["P"] = (column, 0.5 * pressure)
+    nc["PB"] = (column, 0.5 * pressure)
+    nc["T"] = (column, rng.uniform(-50, 50, pressure.shape))
+    nc["PSFC"] = (surface, psfc)
+    nc["MU"] = (surface, 0.5 * psfc)
+    nc["MUB"] = (surface, 0.5 * psfc)
+    nc["EMISS"] = (surface, np.ones(psfc.shape))
+    nc["TSK"] = (surface, rng.uniform(150, 300, psfc.shape))
+    nc["TAU_OD2D"] = (surface, rng.uniform(0, 1, psfc.shape))
+    nc["CO2ICE"] = (surface, rng.uniform(0, 100, psfc.shape))
+    for name in ["TOASW", "TOALW", "RNET_2D", "HFX", "GSW", "GLW", "SWDOWN"]:
+        nc[name] = (surface, rng.uniform(1, 100, psfc.shape))
+    nc = nc.set_coords(["XLAT", "XLONG"])
+    nc.attrs.update(G=3.727, EOMEG=7.08e-5, CP=770.0, R_D=192.0, T0=300.0, P0=610.0)
+    nc.to_netcdf(filename, unlimited_dims=["Time"])
+    return filename
+
+
+@pytest.fixture
+def wrfout():
+    """Factory writing a small synthetic wrfout file, see make_wrfout."""
+    return make_wrfout
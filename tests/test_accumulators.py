@@ -0,0 +1,53 @@
+import numpy as np
+import xarray
+from pydwrf2.database import accumulators
+
+
+def hourly_data(ntime=48, seed=0, offset=0.0):
+    rng = np.random.RandomState(seed)
+    return xarray.Dataset(
+        dict(
+            X=(("Time", "west_east"), offset + rng.normal(size=(ntime, 5))),
+            hour=(("Time",), np.arange(ntime) % 24 // 2 * 2),
+        )
+    )
+
+
+def test_merge_matches_single_pass():
+    blocks = [hourly_data(seed=i) for i in range(5)]
+    hours = np.arange(0, 24, 2)
+    single = accumulators.HourlyAccumulator(hours)
+    for block in blocks:
+        single.update(block)
+    parts = [accumulators.HourlyAccumulator(hours).update(b) for b in blocks]
+    merged = accumulators.tree_merge(parts)
+
+    aggregation = ["mean", "std", "max", "min"]
+    a, b = single.result(aggregation), merged.result(aggregation)
+    for v in a.data_vars:
+        np.testing.assert_allclose(a[v], b[v])
+
+    combined = xarray.concat(blocks, "Time").set_coords("hour").groupby("hour")
+    np.testing.assert_allclose(a["X_mean"], combined.mean("Time")["X"])
+    np.testing.assert_allclose(a["X_max"], combined.max("Time")["X"])
+    np.testing.assert_allclose(a["X_min"], combined.min("Time")["X"])
+
+
+def test_missing_hours_are_empty():
+    acc = accumulators.HourlyAccumulator(np.arange(24))
+    acc.update(hourly_data())
+    result = acc.result(["mean"])
+    assert result.sizes["hour"] == 24
+    assert np.isnan(result["X_mean"].sel(hour=1)).all()
+
+
+def test_variance_is_stable_for_large_means():
+    blocks = [hourly_data(seed=i, offset=1e5).astype(np.float32) for i in range(4)]
+    for block in blocks:
+        block["hour"] = block["hour"].astype(int)
+    parts = [accumulators.HourlyAccumulator(np.arange(0, 24, 2)).update(b) for b in blocks]
+    result = accumulators.tree_merge(parts).result(["std"])
+
+    combined = xarray.concat(blocks, "Time").astype(np.float64).set_coords("hour")
+    expected = combined.groupby("hour").std("Time")["X"]
+    np.testing.assert_allclose(result["X_std"], expected, rtol=1e-6)
@@ -0,0 +1,44 @@
+import numpy as np
+import xarray
+from pydwrf2.core import geometry
+from pydwrf2.wrf import area_integrals
+
+
+def masked_areasum(data, area, south_lim, north_lim, mean=False):
+    """The original where-based implementation."""
+    band = (data.south_north >= south_lim) & (data.south_north < north_lim)
+    filtered_area = area.where(band)
+    result = (data.where(band) * filtered_area).sum(["south_north", "west_east"])
+    if mean:
+        result /= filtered_area.sum(["south_north", "west_east"])
+    return result
+
+
+def test_areasum_matches_masked(grid):
+    nc = grid()
+    geom = geometry.grid_geometry(nc)
+    rng = np.random.RandomState(1)
+    data = xarray.DataArray(rng.uniform(size=(3,) + geom.shape),
+                            dims=("Time", "south_north", "west_east"))
+    data[0, 5, 5] = np.nan
+    for south_lim, north_lim in [(-90, 90), (4, 9), (0, 1), (9, 100)]:
+        for mean in [False, True]:
+            expected = masked_areasum(data, geom.area, south_lim, north_lim, mean)
+            for area in [geom.area, geom]:
+                result = area_integrals.areasum(data, area, south_lim, north_lim, mean)
+                np.testing.assert_allclose(result, expected)
+
+
+def test_integrate_matches_areasum(grid):
+    geom = geometry.grid_geometry(grid())
+    rng = np.random.RandomState(2)
+    dims = ("Time", "south_north", "west_east")
+    variables = dict(a=xarray.DataArray(rng.uniform(size=(2,) + geom.shape), dims=dims),
+                     b=xarray.DataArray(rng.uniform(size=(2,) + geom.shape), dims=dims))
+    bands = dict(north=(9, np.inf), south=(-np.inf, 9), all=area_integrals.GLOBAL)
+    for mean in [False, True]:
+        result = area_integrals.integrate(variables, geom, bands, mean=mean)
+        assert len(result) == 6
+        for (name, band), value in result.items():
+            expected = area_integrals.areasum(variables[name], geom.area, *bands[band], mean=mean)
+            np.testing.assert_allclose(value, expected)
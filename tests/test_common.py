@@ -0,0 +1,73 @@
+import json
+import numpy as np
+import xarray
+from pydwrf2.wrf import common
+
+
+def test_index_scans_streams(tmp_path):
+    for name in ["wrfout_d01_0001-00001_00:00:00", "wrfrst_d01_0001-00002_00:00:00",
+                 "auxhist9_d01_0001-00001_00:00:00", "namelist.input", "wrfout_d01.txt"]:
+        (tmp_path / name).write_bytes(b"x" * 10)
+    times = np.array([b"0001-00001_00:00:00", b"0001-00001_12:00:00"], dtype="S19")
+    xarray.Dataset(dict(Times=("Time", times), L_S=("Time", [0.5, 0.75]))).to_netcdf(
+        str(tmp_path / "wrfout_d01_0001-00002_00:00:00"))
+
+    output = str(tmp_path / "index")
+    files = common._index(str(tmp_path), output, sniff_files=True, threads=2)
+    assert files == json.load(open(output))
+    assert files["wrfout"] == ["wrfout_d01_0001-00001_00:00:00", "wrfout_d01_0001-00002_00:00:00"]
+    assert files["wrfrst"] == ["wrfrst_d01_0001-00002_00:00:00"]
+    assert files["auxhist5"] == []
+    assert files["auxhist9"] == ["auxhist9_d01_0001-00001_00:00:00"]
+
+    metadata = files["metadata"]
+    assert len(metadata) == 4
+    assert metadata["wrfrst_d01_0001-00002_00:00:00"]["size"] == 10
+    assert metadata["wrfrst_d01_0001-00002_00:00:00"]["stream"] == "wrfrst"
+    sniffed = metadata["wrfout_d01_0001-00002_00:00:00"]
+    assert sniffed["first_Times"] == "0001-00001_00:00:00"
+    assert sniffed["last_Times"] == "0001-00001_12:00:00"
+    assert sniffed["last_L_S"] == 0.75
+
+
+def records(sols):
+    times = np.array(["0001-{:05d}_00:00:00".format(s) for s in sols], dtype="S19")
+    return xarray.Dataset(dict(Times=("Time", times),
+                               TSK=(("Time", "south_north"), np.outer(sols, np.ones(3)))))
+
+
+def test_append_netcdf(tmp_path):
+    filename = str(tmp_path / "tsk.nc")
+    assert common.append_netcdf(records([1, 2]), filename) == 2
+    assert common.append_netcdf(records([2, 3, 4, 4]), filename) == 2
+    assert common.append_netcdf(records([1, 3]), filename) == 0
+
+    with xarray.open_dataset(filename) as nc:
+        expected = records([1, 2, 3, 4])
+        np.testing.assert_array_equal(nc["Times"].values, expected["Times"].values)
+        np.testing.assert_array_equal(nc["TSK"].values, expected["TSK"].values)
+
+
+def test_append_netcdf_new_variable(tmp_path):
+    from pydwrf2.core import utils
+    filename = str(tmp_path / "tsk.nc")
+    common.append_netcdf(records([1, 2]), filename)
+    with utils.open_dataset(filename) as nc:
+        assert nc.sizes["Time"] == 2
+
+    data = records([3])
+    data["label"] = ("Time", np.array([b"three"]))
+    data["TSK2"] = data["TSK"] * 2
+    assert common.append_netcdf(data, filename) == 1
+    with xarray.open_dataset(filename) as nc:
+        assert nc.sizes["Time"] == 3
+        assert np.isnan(nc["TSK2"].values[:2]).all()
+        np.testing.assert_array_equal(nc["TSK2"].values[2], 6.0)
+        assert nc["label"].values[2] == b"three"
+
+
+def test_append_netcdf_drops_repeated_times_on_create(tmp_path):
+    filename = str(tmp_path / "tsk.nc")
+    assert common.append_netcdf(records([1, 1, 2]), filename) == 2
+    with xarray.open_dataset(filename) as nc:
+        np.testing.assert_array_equal(nc["Times"].values, records([1, 2])["Times"].values)
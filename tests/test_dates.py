@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+from pydwrf2.wrf import dates
+
+
+TIMES = np.array([b"0001-00001_00:00:00", b"0012-00668_23:59:58", b"2000-12345_06:30:15"])
+
+
+def test_parse_dates():
+    expected = np.array([[1, 1, 0, 0, 0], [12, 668, 23, 59, 58], [2000, 12345, 6, 30, 15]])
+    np.testing.assert_array_equal(dates.parse_dates(TIMES), expected)
+    # decoded strings and undecoded netCDF char arrays give the same result
+    np.testing.assert_array_equal(dates.parse_dates(TIMES.astype(str)), expected)
+    chars = TIMES.view("S1").reshape(len(TIMES), 19)
+    np.testing.assert_array_equal(dates.parse_dates(chars), expected)
+
+
+def test_parse_times_fields():
+    parsed = dates.parse_times(TIMES)
+    np.testing.assert_array_equal(parsed["sol"], [1, 668, 12345])
+    np.testing.assert_array_equal(dates.get_hours(TIMES), [0, 23, 6])
+    np.testing.assert_array_equal(dates.get_seconds(TIMES), [0, 58, 15])
+
+
+def test_parse_times_rejects_bad_digits():
+    with pytest.raises(ValueError):
+        dates.parse_times(np.array([b"0001-0000x_00:00:00"]))
+
+
+def test_dates_to_dict():
+    fields = dates.dates_to_dict(TIMES)
+    assert sorted(fields) == ["hour", "minute", "second", "sol", "year"]
+    np.testing.assert_array_equal(fields["hour"], [0, 23, 6])
+    np.testing.assert_array_equal(fields["second"], [0, 58, 15])
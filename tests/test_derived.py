@@ -0,0 +1,31 @@
+import numpy as np
+import xarray
+from pydwrf2.core import derived
+
+
+def dataset():
+    shape = (2, 3, 4)
+    dims = ("Time", "bottom_top", "south_north")
+    nc = xarray.Dataset(dict(P=(dims, np.full(shape, 100.0)),
+                             PB=(dims, np.full(shape, 510.0)),
+                             T=(dims, np.full(shape, -100.0))))
+    nc.attrs.update(T0=300.0, P0=610.0, R_D=192.0, CP=770.0)
+    return nc
+
+
+def test_requirements():
+    assert derived.requirements(["TEMP"]) == ["T", "P", "PB"]
+    assert derived.requirements(["Times", "PRES", "TSK"]) == ["Times", "P", "PB", "TSK"]
+    # raw variables in the file are not re-derived
+    assert derived.requirements(["PRES"], available=["PRES"]) == ["PRES"]
+
+
+def test_derived_values_are_lazy_and_shared():
+    view = derived.Derived(dataset()).isel(Time=[1], bottom_top=0)
+    assert "TEMP" in view and "QV" not in view
+    assert view._cache == {}
+    temp = view["TEMP"]
+    assert set(view._cache) == {"PRES", "TEMP"}
+    assert temp.dims == ("Time", "south_north")
+    np.testing.assert_allclose(temp, 200.0)
+    assert view["PRES"] is view._cache["PRES"]
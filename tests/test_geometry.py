@@ -0,0 +1,22 @@
+import numpy as np
+from pydwrf2.core import geometry
+
+
+def test_geometry_is_cached_per_grid(grid):
+    a = geometry.grid_geometry(grid())
+    b = geometry.grid_geometry(grid())
+    c = geometry.grid_geometry(grid(ny=36))
+    assert a is b
+    assert a is not c
+    assert a.area.dims == ("south_north", "west_east")
+
+
+def test_geometry_areas(grid):
+    radius = 3389920.0
+    geom = geometry.grid_geometry(grid(radius=radius))
+    sphere = 4 * np.pi * radius ** 2
+    np.testing.assert_allclose(geom.zonal_area.sum(), sphere)
+    np.testing.assert_allclose(geom.total_area, sphere, rtol=1e-2)
+    rows = geometry.band_rows(np.arange(geom.shape[0]), 3, 7)
+    assert rows == slice(3, 7)
+    np.testing.assert_allclose(geom.rows_area(rows), geom.area[3:7].sum())
@@ -0,0 +1,66 @@
+import json
+import os
+import xarray
+from pydwrf2.database import commands, storage
+
+
+def write_ls(intermediate, name, wrfout, ls_offset=0.0, **kwargs):
+    """Intermediate .ls file of the wrfout file name, with L_S shifted by ls_offset."""
+    filename = os.path.join(intermediate, name + ".ls")
+    wrfout(filename, **kwargs)
+    with xarray.open_dataset(filename) as nc:
+        data = nc.load()
+    data["L_S"] = data["L_S"] + ls_offset
+    data.to_netcdf(filename)
+    return filename
+
+
+def test_incremental_index(tmp_path, wrfout, monkeypatch):
+    intermediate = str(tmp_path / "intermediate")
+    os.makedirs(intermediate)
+    index_filename = str(tmp_path / "index")
+    database = str(tmp_path / "database_index.csv")
+    names = ["wrfout_a", "wrfout_b"]
+
+    def run(names):
+        with open(index_filename, "w") as f:
+            json.dump(dict(wrfout=names), f)
+        commands.index(index_filename, database, intermediate)
+        return storage.read_index(database)
+
+    # b shares the records at hours 0 and 12 with a, listed before it
+    write_ls(intermediate, "wrfout_a", wrfout, ntime=4, hours_step=6)
+    write_ls(intermediate, "wrfout_b", wrfout, ntime=4, hours_step=12, ls_offset=100.0)
+    df = run(names)
+    assert len(df) == 6
+    assert df.loc["0001-00001_00:00:00", "Filename"] == "wrfout_a"
+    assert df.loc["0001-00001_12:00:00", "Filename"] == "wrfout_a"
+    assert df.loc["0001-00002_12:00:00", "Filename"] == "wrfout_b"
+
+    opened = []
+    index_one_file = commands._index_one_file
+
+    def spy(filename, source_filename=None):
+        if filename is not None:
+            opened.append(os.path.basename(filename))
+        return index_one_file(filename, source_filename)
+
+    monkeypatch.setattr(commands, "_index_one_file", spy)
+
+    # nothing changed, nothing is opened
+    assert run(names).equals(df)
+    assert opened == []
+
+    # b changes and c is new: only they are reopened and their rows replaced,
+    # while the records b shares with a still come from a
+    write_ls(intermediate, "wrfout_b", wrfout, ntime=5, hours_step=12, ls_offset=200.0)
+    write_ls(intermediate, "wrfout_c", wrfout, ntime=2, start_sol=5)
+    df = run(names + ["wrfout_c"])
+    assert sorted(opened) == ["wrfout_b.ls", "wrfout_c.ls"]
+    assert len(df) == 4 + 3 + 2
+    assert df.loc["0001-00001_12:00:00", "Filename"] == "wrfout_a"
+    b = df[df["Filename"] == "wrfout_b"]
+    assert list(b.index) == ["0001-00002_00:00:00", "0001-00002_12:00:00", "0001-00003_00:00:00"]
+    assert (b["L_S"] >= 200.0).all()
+    assert (df[df["Filename"] == "wrfout_a"]["L_S"] < 100.0).all()
+    assert list(df[df["Filename"] == "wrfout_c"]["File_Counter"]) == [0, 1]
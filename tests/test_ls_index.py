@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+from pydwrf2.database import ls_index
+
+
+def brute_force(df, low, high, partial_sol):
+    ls = df["L_S"].where(df["L_S"] != 360.0, 0.0)
+    if low > high:
+        select = (ls >= low) & (ls < 360.0) | (ls >= 0.0) & (ls < high)
+    else:
+        select = (ls >= low) & (ls < high)
+    if not partial_sol:
+        select = df["Sol"].isin(df["Sol"][select].unique())
+    return df[select]
+
+
+def test_select_matches_brute_force():
+    rng = np.random.RandomState(0)
+    n = 2000
+    sol = np.sort(rng.randint(0, 669, n))
+    ls = np.round(sol * 360.0 / 669 + rng.uniform(0, 0.5, n), 1) % 360
+    ls[::97] = 360.0
+    df = pd.DataFrame(dict(L_S=ls, Sol=sol))
+    index = ls_index.LsIndex(df)
+    for low, high in [(0, 5), (100, 105), (355, 5), (357.5, 360), (200, 100)]:
+        for partial_sol in [True, False]:
+            expected = brute_force(df, low, high, partial_sol)
+            pd.testing.assert_frame_equal(index.select(low, high, partial_sol), expected)
+
+
+def test_ls_windows():
+    from pydwrf2.database.commands import ls_windows
+    windows = ls_windows(10, overlap=5)
+    assert len(windows) == 72
+    assert windows[0] == (0.0, 10.0)
+    assert windows[-1] == (355.0, 5.0)
+    assert ls_windows(10, 5, wrap=False)[-1] == (355.0, 360.0)
+    assert ls_windows(90, start=45)[-1] == (315.0, 45.0)
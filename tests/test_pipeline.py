@@ -0,0 +1,38 @@
+import xarray
+from pydwrf2.wrf import commands, t15
+
+
+def test_diagnostics_match_single_commands(tmp_path, wrfout):
+    filename = wrfout(str(tmp_path / "wrfout_d01"))
+    outputs = dict(
+        energy_balance=str(tmp_path / "pipe_eb.nc"),
+        t15=str(tmp_path / "pipe_t15.nc"),
+        zonal_mean_surface=str(tmp_path / "pipe_zm.nc"),
+    )
+    options = dict(zonal_mean_surface=dict(variable=["PSFC", "TSK"]))
+    commands.diagnostics(filename, outputs, options)
+
+    commands.energy_balance(filename, str(tmp_path / "eb.nc"))
+    commands.zonal_mean_surface(filename, str(tmp_path / "zm.nc"), ["PSFC", "TSK"])
+    with xarray.open_dataset(filename) as nc:
+        xarray.Dataset(t15.process_file(nc)).to_netcdf(str(tmp_path / "t15.nc"))
+
+    for pipe, single in [("pipe_eb.nc", "eb.nc"), ("pipe_zm.nc", "zm.nc"),
+                         ("pipe_t15.nc", "t15.nc")]:
+        with xarray.open_dataset(str(tmp_path / pipe)) as a, \
+                xarray.open_dataset(str(tmp_path / single)) as b:
+            assert sorted(a.data_vars) == sorted(b.data_vars)
+            assert a.sizes["Time"] == 4
+            xarray.testing.assert_allclose(a.load(), b.load())
+
+
+def test_diagnostics_append_new_records(tmp_path, wrfout):
+    output = str(tmp_path / "zm.nc")
+    for k in range(2):
+        filename = wrfout(str(tmp_path / "wrfout_{}".format(k)), start_sol=k, seed=k)
+        commands.diagnostics(filename, dict(zonal_mean_surface=output),
+                             dict(zonal_mean_surface=dict(variable="PSFC")))
+    # the second file repeats no Times of the first, so both are kept in full
+    with xarray.open_dataset(output) as nc:
+        assert nc.sizes["Time"] == 8
+        assert list(nc["Times"].values) == sorted(nc["Times"].values)
@@ -0,0 +1,27 @@
+import numpy as np
+import xarray
+from pydwrf2.core import derived
+from pydwrf2.database import commands
+
+
+def test_time_runs():
+    assert commands.time_runs([]) == []
+    assert commands.time_runs([0, 1, 2, 3]) == [(0, 4)]
+    assert commands.time_runs([1, 2, 5, 6, 7, 9]) == [(1, 3), (5, 8), (9, 10)]
+    # unsorted and repeated records are coalesced into the same runs
+    assert commands.time_runs([7, 1, 9, 6, 2, 5, 6]) == [(1, 3), (5, 8), (9, 10)]
+
+
+def test_read_records_derives_selected_records(tmp_path, wrfout):
+    filename = wrfout(str(tmp_path / "wrfout_d01"), ntime=8, hours_step=3)
+    counters = [6, 1, 2, 5]
+    data = commands.read_records(filename, ["PRES", "TEMP", "TSK", "hour"], counters)
+
+    selected = [1, 2, 5, 6]
+    assert data.sizes["Time"] == len(selected)
+    np.testing.assert_array_equal(data["hour"], 3 * np.array(selected))
+    with xarray.open_dataset(filename) as nc:
+        expected = derived.Derived(nc.isel(Time=selected).load())
+        for v in ["PRES", "TEMP", "TSK"]:
+            np.testing.assert_allclose(data[v], expected[v])
+    assert not {"P", "PB", "T"} & set(data.variables)
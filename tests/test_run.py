@@ -0,0 +1,63 @@
+import json
+import numpy as np
+import pytest
+import xarray
+from pydwrf2.core import run, utils
+
+pytest.importorskip("dask")
+
+
+def write_file(path, start, records):
+    times = np.array(["0001-{:05d}_00:00:00".format(start + i) for i in range(records)],
+                     dtype="S19")
+    xarray.Dataset(
+        dict(Times=("Time", times),
+             T=(("Time", "south_north"), np.arange(start, start + records)[:, None] * np.ones(3)),
+             HGT=("south_north", np.arange(3.0))),
+        attrs=dict(RADIUS=3389920.0)).to_netcdf(path)
+
+
+def test_run_manifest(tmp_path):
+    names = ["wrfout_d01_0001-00001_00:00:00", "wrfout_d01_0001-00003_00:00:00"]
+    write_file(str(tmp_path / names[0]), 1, 2)
+    write_file(str(tmp_path / names[1]), 3, 3)
+    index_filename = str(tmp_path / "index")
+    with open(index_filename, "w") as f:
+        json.dump(dict(root=str(tmp_path), wrfout=names), f)
+
+    manifest = run.build_run_manifest(index_filename)
+    assert [f["offset"] for f in manifest.files] == [0, 2]
+    assert manifest.records == 5
+    assert run.RunManifest(index_filename + ".run.json").update(
+        [str(tmp_path / n) for n in names]) == []
+
+    with utils.open_dataset(index_filename + ".run.json") as nc:
+        assert nc["T"].chunks == ((2, 3), (3,))
+        assert nc.attrs["RADIUS"] == 3389920.0
+        expected = xarray.open_mfdataset([str(tmp_path / n) for n in names],
+                                         concat_dim="Time", combine="nested",
+                                         data_vars="minimal")
+        np.testing.assert_array_equal(nc["T"].values, expected["T"].values)
+        np.testing.assert_array_equal(nc["Times"].values, expected["Times"].values)
+        np.testing.assert_array_equal(nc["HGT"].values, np.arange(3.0))
+        expected.close()
+
+
+def test_run_manifest_shape_mismatch(tmp_path):
+    paths = [str(tmp_path / "a.nc"), str(tmp_path / "b.nc")]
+    write_file(paths[0], 1, 2)
+    xarray.Dataset(dict(Times=("Time", np.array([b"0001-00003_00:00:00"])),
+                        T=(("Time", "south_north"), np.zeros((1, 4))),
+                        HGT=("south_north", np.arange(4.0)))).to_netcdf(paths[1])
+    with pytest.raises(ValueError):
+        run.RunManifest(str(tmp_path / "run.json")).update(paths)
+
+
+def test_open_run_errors(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        with utils.open_dataset(str(tmp_path / "missing.run.json")):
+            pass
+    manifest = run.RunManifest(str(tmp_path / "empty.run.json"))
+    manifest.save()
+    with pytest.raises(ValueError):
+        run.open_run(manifest.filename)
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pydwrf2.database import storage
+
+
+def index_table(n=48):
+    times = ["0001-{:05d}_{:02d}:00:00".format(1 + i // 12, 2 * (i % 12)) for i in range(n)]
+    return pd.DataFrame(
+        dict(
+            File_Counter=np.arange(n) % 12,
+            Filename=["wrfout_{}".format(i // 12) for i in range(n)],
+            L_S=np.linspace(0, 359, n),
+            Year=1,
+            Sol=1 + np.arange(n) // 12,
+            Hour=2 * (np.arange(n) % 12),
+            Minute=0,
+            Second=0,
+        ),
+        index=pd.Index(times, name="Times"),
+    )
+
+
+@pytest.mark.parametrize("extension", [".csv", ".parquet", ".feather"])
+def test_round_trip_and_filters(tmp_path, extension):
+    if extension != ".csv":
+        pytest.importorskip("pyarrow")
+    df = index_table()
+    filename = str(tmp_path / ("index" + extension))
+    storage.write_index(df, filename)
+
+    result = storage.read_index(filename)
+    pd.testing.assert_frame_equal(result, df, check_dtype=False)
+
+    filters = [[("L_S", ">=", 300.0)], [("L_S", "<", 20.0), ("Hour", "in", [0, 2])]]
+    expected = df[(df["L_S"] >= 300) | ((df["L_S"] < 20) & df["Hour"].isin([0, 2]))]
+    result = storage.read_index(filename, filters=filters)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_write_if_changed(tmp_path):
+    from pydwrf2.database.commands import write_if_changed
+    df = index_table()
+    filename = str(tmp_path / "index.csv")
+    assert write_if_changed(df, filename)
+    assert not write_if_changed(storage.read_index(filename), filename)
+
+    # a change outside the index is still a change
+    changed = df.copy()
+    changed.loc[changed.index[3], "L_S"] += 1.0
+    assert write_if_changed(changed, filename)
+    assert not write_if_changed(changed, filename)
+
+    # so is an edit to the file behind the writer's back
+    with open(filename, "a") as f:
+        f.write("\n")
+    assert write_if_changed(changed, filename)
+
+
+@pytest.mark.parametrize("extension", [".csv", ".parquet"])
+def test_write_if_changed_ignores_dtypes(tmp_path, extension):
+    if extension != ".csv":
+        pytest.importorskip("pyarrow")
+    from pydwrf2.database.commands import write_if_changed
+    df = index_table()
+    df["L_S"] = df["L_S"].astype(np.float32) + np.float32(0.1)
+    filename = str(tmp_path / ("index" + extension))
+    assert write_if_changed(df, filename)
+    assert not write_if_changed(df, filename)
+    assert not write_if_changed(storage.read_index(filename), filename)
+    assert not write_if_changed(df.astype(object), filename)
@@ -0,0 +1,37 @@
+import numpy as np
+import xarray
+from pydwrf2.database.summary import SummaryStore
+
+
+def write_file(path, ls):
+    times = np.array(["0001-{:05d}_00:00:00".format(i + 1) for i in range(len(ls))], dtype="S19")
+    xarray.Dataset(dict(Times=("Time", times), L_S=("Time", ls),
+                        TSK=(("Time", "south_north"), np.zeros((len(ls), 3), "f4")))).to_netcdf(path)
+    return path
+
+
+def test_summary_store(tmp_path):
+    paths = [write_file(str(tmp_path / "a.nc"), [10.0, 20.0]),
+             write_file(str(tmp_path / "b.nc"), [250.0, 260.0]),
+             write_file(str(tmp_path / "c.nc"), [355.0, 5.0])]
+    filename = str(tmp_path / "summary.json")
+    store = SummaryStore(filename)
+    assert store.update(paths) == paths
+    store.save()
+
+    record = store[paths[1]]
+    assert record["records"] == 2
+    assert record["first_Times"] == "0001-00001_00:00:00"
+    assert record["last_Times"] == "0001-00002_00:00:00"
+    assert record["variables"]["TSK"] == dict(dims=["Time", "south_north"], shape=[2, 3],
+                                              dtype="float32")
+
+    store = SummaryStore(filename)
+    assert store.update(paths) == []
+    assert store.covering(250, 270) == [paths[1]]
+    assert store.covering(0, 2) == [paths[2]]
+    assert store.covering(340, 15) == [paths[0], paths[2]]
+
+    write_file(paths[0], [100.0, 110.0, 120.0])
+    assert store.update(paths) == [paths[0]]
+    assert store[paths[0]]["records"] == 3
@@ -0,0 +1,90 @@
+import os
+import numpy as np
+import pytest
+import xarray
+from pydwrf2.wrf import t15
+
+
+def column_data(ntime=3, nz=25, ny=6, nx=8, seed=0):
+    """Synthetic pressure/temperature columns in the wrfout layout."""
+    rng = np.random.RandomState(seed)
+    surface = rng.uniform(300.0, 900.0, size=(ntime, 1, ny, nx))
+    sigma = np.exp(-np.linspace(0, 8, nz))[None, :, None, None]
+    press = surface * sigma
+    temp = rng.uniform(140.0, 240.0, size=press.shape)
+    area = rng.uniform(1e10, 5e10, size=(ny, nx))
+    return press, temp, area
+
+
+def test_interp_columns_matches_numpy():
+    press, temp, _ = column_data(ntime=1)
+    p = 0.01 * np.moveaxis(press[0, ::-1], 0, -1)
+    t = np.moveaxis(temp[0, ::-1], 0, -1)
+    tw = t15.interp_columns(p, t, t15.pw)
+    for i in range(p.shape[0]):
+        for j in range(p.shape[1]):
+            expected = np.interp(t15.pw, p[i, j], t[i, j])
+            np.testing.assert_allclose(tw[i, j], expected, rtol=1e-12)
+
+
+def test_t15_core_fast_matches_slow():
+    press, temp, area = column_data()
+    for i in range(press.shape[0]):
+        fast = t15.t15_core_fast(press[i], temp[i], area)
+        slow = t15.t15_core_slow(press[i], temp[i], area)
+        np.testing.assert_allclose(fast, slow, rtol=1e-9)
+
+
+def test_t15_core_vectorized_over_time():
+    press, temp, area = column_data()
+    batch = t15.t15_core_vectorized(press, temp, area)
+    assert batch.shape == (press.shape[0],)
+    for i in range(press.shape[0]):
+        np.testing.assert_allclose(batch[i], t15.t15_core_fast(press[i], temp[i], area))
+
+
+def test_time_blocks():
+    rows = np.arange(10)
+    assert len(t15.time_blocks(rows)) == 1
+    blocks = t15.time_blocks(rows, chunk_size=4)
+    assert [len(b) for b in blocks] == [4, 4, 2]
+    blocks = t15.time_blocks(rows, max_memory=300, nbytes=100)
+    assert [len(b) for b in blocks] == [3, 3, 3, 1]
+    np.testing.assert_array_equal(np.hstack(blocks), rows)
+    # never less than one record per block
+    assert len(t15.time_blocks(rows, max_memory=1, nbytes=100)) == 10
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_process_collection_is_chronological(tmp_path, wrfout, processes):
+    filenames = [wrfout(str(tmp_path / "wrfout_{}".format(k)), ntime=5, start_sol=2 * k, seed=k)
+                 for k in range(3)]
+    data = t15.process_collection(filenames, processes=processes, block_size=2)
+    expected = [t15.process_file(f) for f in filenames]
+    assert data.sizes["Time"] == 15
+    times = data["Times"].values
+    assert list(times) == sorted(times)
+    np.testing.assert_allclose(data["t15"].values,
+                               np.hstack([e["t15"].values for e in expected]))
+
+
+def test_t15_command(tmp_path, wrfout):
+    import json
+    from pydwrf2.wrf import commands
+
+    names = ["wrfout_d01_0001-00001_00:00:00", "wrfout_d01_0001-00002_00:00:00"]
+    for k, name in enumerate(names):
+        wrfout(str(tmp_path / name), start_sol=k, seed=k)
+    index_filename = str(tmp_path / "index")
+    output = str(tmp_path / "t15.nc")
+    with open(index_filename, "w") as f:
+        json.dump(dict(root=str(tmp_path), wrfout=[]), f)
+    commands.t15(index_filename, output, processes=1)
+    assert not os.path.exists(output)
+
+    with open(index_filename, "w") as f:
+        json.dump(dict(root=str(tmp_path), wrfout=names), f)
+    commands.t15(index_filename, output, processes=1, block_size=3)
+    with xarray.open_dataset(output) as nc:
+        assert nc.sizes["Time"] == 8
+        assert list(nc["Times"].values) == sorted(nc["Times"].values)
@@ -0,0 +1,42 @@
+import numpy as np
+from pydwrf2.wrf.model import time
+
+
+def test_get_ls_array_matches_scalar():
+    julian = np.linspace(-700, 1500, 101)
+    ls = time.get_ls(julian)
+    assert ls.shape == julian.shape
+    np.testing.assert_array_equal(ls, [time.get_ls(j) for j in julian])
+    assert np.all((ls >= 0) & (ls < 360))
+
+
+def test_get_julian_round_trip():
+    julian = np.linspace(0.5, 668.5, 200)
+    np.testing.assert_allclose(time.get_julian(time.get_ls(julian)), julian, atol=1e-4)
+    ls = np.linspace(0, 359, 50)
+    np.testing.assert_array_equal(time.get_julian(ls), [time.get_julian(l) for l in ls])
+
+
+def test_lookup_table_error_bounds(tmp_path):
+    table = time.ls_table(cache_dir=str(tmp_path))
+    assert max(table.ls_error, table.julian_error) < 1e-5
+
+    julian = np.random.RandomState(0).uniform(-1000, 2000, 10000)
+    diff = np.mod(time.get_ls(julian, lookup=True) - time.get_ls(julian), 360.0)
+    assert np.minimum(diff, 360.0 - diff).max() <= 2 * table.ls_error
+
+    ls = np.linspace(0, 359.9, 1000)
+    diff = np.mod(time.get_julian(ls, lookup=True) - time.get_julian(ls), 669)
+    assert np.minimum(diff, 669 - diff).max() <= 2 * table.julian_error
+
+    # non-finite input gives NaN, like the exact functions
+    special = np.array([np.nan, np.inf, 10.0])
+    for lookup in [False, True]:
+        ls = time.get_ls(special, lookup=lookup)
+        assert np.isnan(ls[:2]).all() and np.isfinite(ls[2])
+        assert np.isnan(time.get_julian(np.nan, lookup=lookup))
+
+    # persisted tables are reloaded unchanged
+    time.ls_table.cache_clear()
+    reloaded = time.ls_table(cache_dir=str(tmp_path))
+    np.testing.assert_array_equal(reloaded.ls, table.ls)
@@ -0,0 +1,71 @@
+import os
+import numpy as np
+import xarray
+from pydwrf2.core import utils
+
+
+def write_file(path, value):
+    xarray.Dataset(dict(a=("x", np.full(3, value)))).to_netcdf(path)
+    return path
+
+
+def test_pool_reuses_and_evicts(tmp_path):
+    pool = utils.DatasetPool(max_handles=2)
+    paths = [write_file(str(tmp_path / "{}.nc".format(i)), i) for i in range(3)]
+
+    key, first = pool.acquire(paths[0])
+    pool.release(key)
+    key, again = pool.acquire(paths[0])
+    assert again is first
+
+    # the held handle survives eviction, idle ones are closed oldest first
+    for path in paths[1:]:
+        pool.release(pool.acquire(path)[0])
+    assert len(pool) == 2
+    assert key in pool._handles
+    assert float(first["a"][0]) == 0.0
+    pool.release(key)
+    pool.clear()
+    assert len(pool) == 0
+
+
+def test_pool_reopens_changed_files(tmp_path):
+    pool = utils.DatasetPool()
+    path = write_file(str(tmp_path / "a.nc"), 1.0)
+    key, ds = pool.acquire(path)
+    assert float(ds["a"][0]) == 1.0
+    pool.release(key)
+
+    # replace the file while the old handle is still pooled
+    other = str(tmp_path / "b.nc")
+    xarray.Dataset(dict(a=("x", np.full(5, 2.0)))).to_netcdf(other)
+    os.replace(other, path)
+    new_key, ds = pool.acquire(path)
+    assert new_key != key
+    assert float(ds["a"][0]) == 2.0
+    assert len(pool) == 1
+    pool.release(new_key)
+
+
+def test_open_dataset_copies(tmp_path):
+    path = write_file(str(tmp_path / "a.nc"), 1.0)
+    with utils.open_dataset(path) as nc:
+        nc["b"] = nc["a"] * 2
+    with utils.open_dataset(path) as nc:
+        assert "b" not in nc
+
+
+def test_discard_before_writing(tmp_path):
+    path = write_file(str(tmp_path / "a.nc"), 1.0)
+    with utils.open_dataset(path) as nc:
+        assert float(nc["a"][0]) == 1.0
+    utils.POOL.discard(path)
+    write_file(path, 3.0)
+    with utils.open_dataset(path) as nc:
+        assert float(nc["a"][0]) == 3.0
+
+
+def test_open_dataset_list(tmp_path):
+    paths = [write_file(str(tmp_path / "{}.nc".format(i)), i) for i in range(2)]
+    with utils.open_dataset(paths, aggdim="x") as nc:
+        assert nc.sizes["x"] == 6